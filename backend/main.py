@@ -9,6 +9,11 @@ from dotenv import load_dotenv
 
 from src.api.routes import router as api_router
 from src.api.middleware import setup_middleware
+from src.api.websocket import websocket_endpoint
+from src.api.dependencies import close_arc_client, get_ai_agent, get_quote_service
+from src.ai.llm_client import get_llm_client, close_llm_clients
+from src.ai.prompts import EXTRACT_PROMPTS, EXTRACT_PROMPT_TOKEN_BUDGET
+from src.ai.token_counter import check_prompt_sizes
 
 # Load environment variables
 load_dotenv()
@@ -18,9 +23,22 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events"""
     # Startup
     print("🚀 Starting PayFlow AI Backend...")
+    try:
+        await get_llm_client().warm_up()
+    except ValueError as e:
+        print(f"⚠️ Skipping LLM warm-up: {e}")
+    for problem in check_prompt_sizes(EXTRACT_PROMPTS, EXTRACT_PROMPT_TOKEN_BUDGET):
+        print(f"⚠️ Prompt over token budget: {problem}")
+    # Fails fast when several workers would each keep their own record of used quotes
+    get_quote_service()
+    # Load (and seed) the embedding intent index here rather than on a request
+    if os.getenv("AI_INTENT_BACKEND", "llm").lower() == "embedding":
+        await get_ai_agent().intent_classifier.embedding_classifier.start()
     yield
     # Shutdown
     print("👋 Shutting down PayFlow AI Backend...")
+    await close_llm_clients()
+    await close_arc_client()
 
 # Create FastAPI app
 app = FastAPI(
@@ -36,6 +54,9 @@ setup_middleware(app)
 # Include API routes
 app.include_router(api_router, prefix="/api", tags=["api"])
 
+# Real-time chat (add ?stream=true for staged events)
+app.add_api_websocket_route("/ws/{client_id}", websocket_endpoint)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
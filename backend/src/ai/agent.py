@@ -1,121 +1,581 @@
 """
 Main AI Agent - Orchestrates intent classification, entity extraction, and execution
 """
-from typing import Dict, Any, Optional
+import asyncio
+import copy
+import os
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 from src.ai.intent_classifier import IntentClassifier, Intent
 from src.ai.entity_extractor import EntityExtractor
 from src.ai.safety import SafetyChecker
 from src.ai.response_formatter import ResponseFormatter
+from src.services.cache_service import CacheService
+from src.utils.formatter import Formatter
+from src.utils.singleflight import SingleFlight
+from src.utils.stage_metrics import StageHistograms, StageTrace, stage
 
 
 class AIAgent:
     """Main AI agent that processes user messages and executes actions"""
     
+    # Intents that carry no entities worth extracting
+    NO_ENTITY_INTENTS = {Intent.HELP, Intent.BALANCE_QUERY, Intent.TRANSACTION_HISTORY}
+    
     def __init__(
         self,
         intent_classifier: Optional[IntentClassifier] = None,
         entity_extractor: Optional[EntityExtractor] = None,
-        safety_checker: Optional[SafetyChecker] = None
+        safety_checker: Optional[SafetyChecker] = None,
+        fused_parsing: Optional[bool] = None,
+        speculative_extraction: Optional[bool] = None,
+        sessions: Optional[CacheService] = None
     ):
-        """Initialize AI agent"""
+        """
+        Initialize AI agent
+        
+        Args:
+            intent_classifier: Intent classifier instance
+            entity_extractor: Entity extractor instance
+            safety_checker: Safety checker instance
+            fused_parsing: Classify and extract in one completion instead of two
+                (defaults to the AI_FUSED_PARSING env var, enabled unless "false")
+            speculative_extraction: In two-call mode, extract entities concurrently
+                with classification (defaults to the AI_SPECULATIVE_EXTRACTION env var)
+            sessions: Store for per-session pending intents awaiting missing fields
+                (bounded by AI_SESSION_MAX_ENTRIES, expiring after AI_SESSION_TTL seconds)
+        """
         self.intent_classifier = intent_classifier or IntentClassifier()
         self.entity_extractor = entity_extractor or EntityExtractor()
         self.safety_checker = safety_checker or SafetyChecker()
         self.response_formatter = ResponseFormatter()
+        self._inflight = SingleFlight()
+        
+        if fused_parsing is None:
+            fused_parsing = os.getenv("AI_FUSED_PARSING", "true").lower() != "false"
+        self.fused_parsing = fused_parsing
+        
+        if speculative_extraction is None:
+            speculative_extraction = os.getenv("AI_SPECULATIVE_EXTRACTION", "false").lower() == "true"
+        self.speculative_extraction = speculative_extraction
+        
+        # Speculative extractions: "launched", "kept", "wasted"
+        self.speculation_counts: Counter = Counter()
+        
+        self.sessions = sessions or CacheService(
+            max_entries=int(os.getenv("AI_SESSION_MAX_ENTRIES", "10000")),
+            default_ttl=int(os.getenv("AI_SESSION_TTL", "300"))
+        )
+        # Follow-ups to a pending intent: "merged" (slots filled locally), "abandoned" (new request),
+        # "cancelled" (the user called it off)
+        self.slot_fill_counts: Counter = Counter()
+        
+        # Multi-payment messages decomposed locally into one batch
+        self.decomposed_count = 0
+        
+        # Per-stage latency and token histograms across processed messages
+        self.stage_histograms = StageHistograms()
     
-    async def process_message(
+    async def _understand(
         self,
         user_message: str,
-        user_address: Optional[str] = None
-    ) -> Dict[str, Any]:
+        on_intent: Optional[Callable[[Intent], Awaitable[None]]] = None
+    ) -> Tuple[Intent, Dict[str, Any]]:
         """
-        Process user message and return response
+        Turn a user message into an intent and its entities
         
         Args:
             user_message: User's message/text command
-            user_address: User's wallet address (optional)
+            on_intent: Awaited as soon as the intent is decided, before extraction
             
         Returns:
-            Dictionary with intent, response, and status
+            Tuple of (intent, entities)
         """
-        try:
-            # 1. Classify intent
-            intent = await self.intent_classifier.classify(user_message)
+        # Several "<amount> to <recipient>" pairs: one batch payment, no LLM pass
+        with stage("classification"):
+            payments = self.entity_extractor.local_parser.parse_payments(user_message)
+        if payments:
+            self.decomposed_count += 1
+            if on_intent:
+                await on_intent(Intent.BATCH_PAYMENT)
+            return Intent.BATCH_PAYMENT, {"payments": payments}
+        
+        # Rule-based and embedding fast paths; only ambiguous messages reach the LLM
+        with stage("classification"):
+            intent = self.intent_classifier.classify_fast(user_message)
+            if intent is None:
+                intent = await self.intent_classifier.classify_embedding(user_message)
             
-            # 2. Extract entities
+            if intent is None and not self.intent_classifier.llm.available:
+                # LLM circuit open: degrade to keyword classification and local extraction
+                intent = self.intent_classifier.classify_degraded(user_message)
+        
+        if intent is None:
+            if self.fused_parsing:
+                # One completion does both, so it is timed as its own stage
+                with stage("fused"):
+                    intent, entities = await self.intent_classifier.classify_and_extract(user_message)
+                if on_intent:
+                    await on_intent(intent)
+                return intent, entities
+            if self.speculative_extraction:
+                return await self._classify_with_speculation(user_message, on_intent)
+            with stage("classification"):
+                intent = await self.intent_classifier.classify(user_message, use_local=False)
+        
+        if on_intent:
+            await on_intent(intent)
+        
+        if intent in self.NO_ENTITY_INTENTS:
+            return intent, {}
+        
+        with stage("extraction"):
             entities = await self.entity_extractor.extract(user_message, intent.value)
+        return intent, entities
+    
+    async def _understand_in_session(
+        self,
+        user_message: str,
+        session_id: Optional[str] = None,
+        on_intent: Optional[Callable[[Intent], Awaitable[None]]] = None,
+        user_address: Optional[str] = None
+    ) -> Tuple[Intent, Dict[str, Any]]:
+        """
+        Understand a message, merging it into the session's pending intent when it only fills missing fields
+        
+        Args:
+            user_message: User's message/text command
+            session_id: Conversation session identifier (optional)
+            on_intent: Awaited as soon as the intent is decided, before extraction
+            user_address: User's wallet address; only the same address can complete a pending intent
             
-            # 3. Prepare response based on intent
-            response_data = {
+        Returns:
+            Tuple of (intent, entities)
+        """
+        if not session_id:
+            return await self._understand(user_message, on_intent)
+        
+        session_key = f"session:{session_id}"
+        with stage("extraction"):
+            filled = self._fill_pending_slots(session_key, user_message, user_address)
+        if filled is not None:
+            intent, entities = filled
+            if on_intent:
+                await on_intent(intent)
+        else:
+            intent, entities = await self._understand(user_message, on_intent)
+        
+        # Remember an incomplete request so the next message can complete it
+        if self._missing_slots(intent, entities):
+            self.sessions.set(session_key, {
                 "intent": intent.value,
-                "entities": entities,
-                "response": "",
-                "status": "success"
-            }
+                "entities": copy.deepcopy(entities),
+                "user_address": user_address
+            })
+        else:
+            self.sessions.delete(session_key)
+        
+        return intent, entities
+    
+    def _fill_pending_slots(
+        self,
+        session_key: str,
+        user_message: str,
+        user_address: Optional[str] = None
+    ) -> Optional[Tuple[Intent, Dict[str, Any]]]:
+        """
+        Merge a follow-up into the session's pending intent without classifying it
+        
+        Args:
+            session_key: Session store key
+            user_message: User's follow-up message
+            user_address: User's wallet address (must match the one the pending intent was started with)
             
-            # Handle different intents
-            if intent == Intent.HELP:
-                response_data["response"] = self.response_formatter.format_help()
+        Returns:
+            Tuple of (intent, merged entities), (UNKNOWN, {"cancelled": True}) if the reply
+            calls off the pending intent, or None if the message is not a slot-filling follow-up
+        """
+        pending = self.sessions.get(session_key)
+        # Another address cannot complete (or cancel) someone else's payment
+        if pending is None or pending.get("user_address") != user_address:
+            return None
+        
+        if self.entity_extractor.local_parser.is_cancellation(user_message):
+            self.sessions.delete(session_key)
+            self.slot_fill_counts["cancelled"] += 1
+            return Intent.UNKNOWN, {"cancelled": True}
+        
+        intent = Intent(pending["intent"])
+        slots = self._missing_slots(intent, pending["entities"])
+        found = self.entity_extractor.local_parser.parse_slots(user_message, slots)
+        
+        # Anything beyond the missing fields (or a complete command) is a new request
+        if (
+            not found
+            or set(found) - slots - {"description"}
+            or self.intent_classifier.rule_classifier.classify(user_message) is not None
+        ):
+            self.sessions.delete(session_key)
+            self.slot_fill_counts["abandoned"] += 1
+            return None
+        
+        self.slot_fill_counts["merged"] += 1
+        return intent, {**pending["entities"], **found}
+    
+    def _missing_slots(self, intent: Intent, entities: Dict[str, Any]) -> set:
+        """Every field that could satisfy one of the intent's unfilled requirements"""
+        return {
+            field
+            for group in self.entity_extractor.REQUIRED_FIELDS.get(intent.value, [])
+            if not any(entities.get(name) for name in group)
+            for field in group
+        }
+    
+    async def _classify_with_speculation(
+        self,
+        user_message: str,
+        on_intent: Optional[Callable[[Intent], Awaitable[None]]] = None
+    ) -> Tuple[Intent, Dict[str, Any]]:
+        """
+        Classify while an intent-agnostic extraction runs concurrently
+        
+        The speculative entities are kept when they satisfy the classified
+        intent's required fields; otherwise extraction is redone for that intent.
+        
+        Args:
+            user_message: User's message/text command
+            on_intent: Awaited as soon as the intent is decided, before extraction
             
-            elif intent == Intent.BALANCE_QUERY:
-                # This will be handled by the API route that calls blockchain
-                response_data["response"] = "Checking balance..."
+        Returns:
+            Tuple of (intent, entities)
+        """
+        self.speculation_counts["launched"] += 1
+        speculation = asyncio.create_task(self.entity_extractor.extract_any(user_message))
+        
+        try:
+            with stage("classification"):
+                intent = await self.intent_classifier.classify(user_message, use_local=False)
+            if on_intent:
+                await on_intent(intent)
+        except BaseException:
+            speculation.cancel()
+            raise
+        
+        if intent in self.NO_ENTITY_INTENTS:
+            speculation.cancel()
+            self.speculation_counts["wasted"] += 1
+            return intent, {}
+        
+        # Extraction time here is only what classification did not already overlap
+        with stage("extraction"):
+            entities = await speculation
+        if not self.entity_extractor.missing_fields(intent.value, entities):
+            self.speculation_counts["kept"] += 1
+            return intent, entities
+        
+        self.speculation_counts["wasted"] += 1
+        with stage("extraction"):
+            entities = await self.entity_extractor.extract(user_message, intent.value)
+        return intent, entities
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get AI pipeline statistics
+        
+        Returns:
+            Dictionary of per-component counters
+        """
+        return {
+            "intent_classifier": self.intent_classifier.get_stats(),
+            "entity_extractor": self.entity_extractor.get_stats(),
+            "speculation": {
+                "launched": self.speculation_counts["launched"],
+                "kept": self.speculation_counts["kept"],
+                "wasted": self.speculation_counts["wasted"],
+                "waste_rate": (
+                    self.speculation_counts["wasted"] / self.speculation_counts["launched"]
+                    if self.speculation_counts["launched"] else 0.0
+                )
+            },
+            "decomposed_batches": self.decomposed_count,
+            "slot_filling": {
+                "merged": self.slot_fill_counts["merged"],
+                "abandoned": self.slot_fill_counts["abandoned"],
+                "cancelled": self.slot_fill_counts["cancelled"],
+                "sessions": self.sessions.get_stats()
+            },
+            "coalescing": self._inflight.get_stats(),
+            "llm": self.intent_classifier.llm.get_stats(),
+            "routing": self.intent_classifier.router.get_stats(),
+            "stages": self.stage_histograms.get_stats()
+        }
+    
+    async def process_message(
+        self,
+        user_message: str,
+        user_address: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Process user message and return response
+        
+        Args:
+            user_message: User's message/text command
+            user_address: User's wallet address (optional)
+            session_id: Conversation session, for completing a previous incomplete request (optional)
             
-            elif intent == Intent.TRANSACTION_HISTORY:
-                # This will be handled by the API route
-                response_data["response"] = "Fetching transaction history..."
+        Returns:
+            Dictionary with intent, response, status, and per-stage metrics
+        """
+        # Retries and bursts of the same command share one pipeline run
+        key = f"{session_id or ''}:{user_address or ''}:{Formatter.normalize_message(user_message)}"
+        result = await self._inflight.do(
+            key,
+            lambda: self._process_message(user_message, user_address, session_id)
+        )
+        return copy.deepcopy(result)
+    
+    async def _process_message(
+        self,
+        user_message: str,
+        user_address: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the classify -> extract -> respond pipeline for one message
+        
+        Args:
+            user_message: User's message/text command
+            user_address: User's wallet address (optional)
+            session_id: Conversation session identifier (optional)
             
-            elif intent == Intent.SIMPLE_PAYMENT:
-                amount = entities.get("amount")
-                recipient = entities.get("recipient")
+        Returns:
+            Dictionary with intent, response, status, and per-stage metrics
+        """
+        trace = StageTrace()
+        with trace.activate():
+            try:
+                # 1. Classify intent and extract entities (or complete the session's pending intent)
+                intent, entities = await self._understand_in_session(
+                    user_message, session_id, user_address=user_address
+                )
                 
-                if not amount or not recipient:
-                    response_data["response"] = self.response_formatter.format_error(
-                        "Missing amount or recipient. Please specify both."
-                    )
-                    response_data["status"] = "error"
-                elif user_address:
-                    # Check safety limits
+                # 2. Prepare response based on intent
+                with stage("formatting"):
+                    result = self._build_response(intent, entities, user_address)
+                
+            except Exception as e:
+                result = self._error_response(e)
+        
+        result["metrics"] = trace.to_dict()
+        self.stage_histograms.observe(result["metrics"])
+        return result
+    
+    async def process_message_stream(
+        self,
+        user_message: str,
+        user_address: Optional[str] = None,
+        execute: Optional[Callable[[Dict[str, Any]], Awaitable[Optional[str]]]] = None,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process user message, yielding staged events as soon as each is available
+        
+        Events, in order: "intent", "entities", "tx_submitted" (only when
+        execute submits a transaction), "response" with the reply text, then
+        "done" with the final status. Failures yield a single "error" event.
+        
+        Args:
+            user_message: User's message/text command
+            user_address: User's wallet address (optional)
+            execute: Coroutine that quotes or executes a ready result, returning a tx hash if one was sent (optional)
+            session_id: Conversation session identifier (optional)
+            
+        Yields:
+            Event dictionaries with an "event" key
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        trace = StageTrace()
+        
+        async def on_intent(intent: Intent):
+            await events.put({"event": "intent", "intent": intent.value})
+        
+        async def run() -> Tuple[Intent, Dict[str, Any]]:
+            try:
+                with trace.activate():
+                    return await self._understand_in_session(user_message, session_id, on_intent, user_address)
+            finally:
+                await events.put(None)
+        
+        pipeline = asyncio.create_task(run())
+        try:
+            # Relay stage events while the pipeline is still running
+            while (event := await events.get()) is not None:
+                yield event
+            intent, entities = await pipeline
+        except Exception as e:
+            yield {"event": "error", **self._error_response(e)}
+            return
+        finally:
+            pipeline.cancel()
+        
+        yield {"event": "entities", "entities": entities}
+        with trace.activate(), stage("formatting"):
+            result = self._build_response(intent, entities, user_address)
+        metrics = trace.to_dict()
+        self.stage_histograms.observe(metrics)
+        
+        if execute and result["status"] == "success":
+            try:
+                tx_hash = await execute(result)
+                if tx_hash:
+                    yield {"event": "tx_submitted", "transaction_hash": tx_hash}
+            except Exception as e:
+                result["status"] = "error"
+                result["response"] = f"❌ Transaction failed: {str(e)}"
+        
+        # Replies are rendered from templates, so the text is sent whole rather than token by token
+        yield {"event": "response", "text": result["response"]}
+        
+        yield {
+            "event": "done",
+            "intent": result["intent"],
+            "status": result["status"],
+            "transaction_hash": result.get("transaction_hash"),
+            "quote": result.get("quote"),
+            "metrics": metrics
+        }
+    
+    def _build_response(
+        self,
+        intent: Intent,
+        entities: Dict[str, Any],
+        user_address: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the response for a classified message
+        
+        Args:
+            intent: Classified intent
+            entities: Extracted entities
+            user_address: User's wallet address (optional)
+            
+        Returns:
+            Dictionary with intent, entities, response, and status
+        """
+        response_data = {
+            "intent": intent.value,
+            "entities": entities,
+            "response": "",
+            "status": "success"
+        }
+        
+        # Handle different intents
+        if intent == Intent.HELP:
+            response_data["response"] = self.response_formatter.format_help()
+        
+        elif intent == Intent.BALANCE_QUERY:
+            # This will be handled by the API route that calls blockchain
+            response_data["response"] = "Checking balance..."
+        
+        elif intent == Intent.TRANSACTION_HISTORY:
+            # This will be handled by the API route
+            response_data["response"] = "Fetching transaction history..."
+        
+        elif intent == Intent.SIMPLE_PAYMENT:
+            amount = entities.get("amount")
+            recipient = entities.get("recipient")
+            
+            if not amount or not recipient:
+                response_data["response"] = self.response_formatter.format_error(
+                    "Missing amount or recipient. Please specify both."
+                )
+                response_data["status"] = "error"
+            elif user_address:
+                # Check safety limits
+                with stage("safety"):
                     is_valid, error_msg = self.safety_checker.check_transaction_limits(
                         amount, user_address
                     )
+                if not is_valid:
+                    response_data["response"] = self.response_formatter.format_error(error_msg)
+                    response_data["status"] = "error"
+                else:
+                    # Ready for execution
+                    response_data["response"] = f"Ready to send ${amount:.2f} to {recipient}"
+        
+        elif intent == Intent.BATCH_PAYMENT:
+            payments = [payment for payment in entities.get("payments") or [] if isinstance(payment, dict)]
+            
+            if not payments or any(not p.get("amount") or not p.get("recipient") for p in payments):
+                response_data["response"] = self.response_formatter.format_error(
+                    "Missing amount or recipient for one of the payments. Please specify both for each."
+                )
+                response_data["status"] = "error"
+            else:
+                for payment in payments:
+                    payment["amount"] = float(payment["amount"])
+                entities["payments"] = payments
+                
+                if user_address:
+                    # All payments go out in one transaction, so they are checked together
+                    with stage("safety"):
+                        is_valid, error_msg = self.safety_checker.check_batch_limits(
+                            [payment["amount"] for payment in payments], user_address
+                        )
                     if not is_valid:
                         response_data["response"] = self.response_formatter.format_error(error_msg)
                         response_data["status"] = "error"
                     else:
-                        # Ready for execution
-                        response_data["response"] = f"Ready to send ${amount:.2f} to {recipient}"
+                        total = sum(payment["amount"] for payment in payments)
+                        details = ", ".join(f"${p['amount']:.2f} to {p['recipient']}" for p in payments)
+                        response_data["response"] = (
+                            f"Ready to send {len(payments)} payments totalling ${total:.2f}: {details}"
+                        )
+        
+        elif intent == Intent.SPLIT_PAYMENT:
+            amount = entities.get("amount")
+            num_people = entities.get("num_people")
             
-            elif intent == Intent.SPLIT_PAYMENT:
-                amount = entities.get("amount")
-                num_people = entities.get("num_people")
-                
-                if not amount or not num_people:
-                    response_data["response"] = self.response_formatter.format_error(
-                        "Missing amount or number of people. Please specify both."
-                    )
-                    response_data["status"] = "error"
-                elif user_address:
-                    per_person = amount / num_people
+            if not amount or not num_people:
+                response_data["response"] = self.response_formatter.format_error(
+                    "Missing amount or number of people. Please specify both."
+                )
+                response_data["status"] = "error"
+            elif user_address:
+                per_person = amount / num_people
+                with stage("safety"):
                     is_valid, error_msg = self.safety_checker.check_transaction_limits(
                         amount, user_address
                     )
-                    if not is_valid:
-                        response_data["response"] = self.response_formatter.format_error(error_msg)
-                        response_data["status"] = "error"
-                    else:
-                        response_data["response"] = f"Ready to split ${amount:.2f} between {num_people} people (${per_person:.2f} each)"
-            
-            else:
-                response_data["response"] = "I understand your request. Processing..."
-            
-            return response_data
+                if not is_valid:
+                    response_data["response"] = self.response_formatter.format_error(error_msg)
+                    response_data["status"] = "error"
+                else:
+                    response_data["response"] = f"Ready to split ${amount:.2f} between {num_people} people (${per_person:.2f} each)"
+        
+        elif entities.get("cancelled"):
+            response_data["response"] = "Okay, I've cancelled that request."
+        
+        else:
+            response_data["response"] = "I understand your request. Processing..."
+        
+        return response_data
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """
+        Build the response for a message that failed to process
+        
+        Args:
+            error: Exception raised while processing
             
-        except Exception as e:
-            return {
-                "intent": "unknown",
-                "entities": {},
-                "response": self.response_formatter.format_error(str(e)),
-                "status": "error"
-            }
+        Returns:
+            Dictionary with intent, entities, response, and status
+        """
+        return {
+            "intent": "unknown",
+            "entities": {},
+            "response": self.response_formatter.format_error(str(error)),
+            "status": "error"
+        }
 
@@ -0,0 +1,238 @@
+"""
+Embedding Classifier - Nearest-neighbour intent classification over labelled example utterances
+"""
+import asyncio
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from src.ai.llm_client import LLMClient
+
+
+class EmbeddingIntentClassifier:
+    """Classifies messages by cosine similarity to labelled examples in a local vector index"""
+    
+    VECTORS_FILE = "vectors.npy"
+    LABELS_FILE = "labels.json"
+    LOCK_FILE = ".lock"
+    
+    # Bootstraps an empty index; more examples can be added at runtime
+    SEED_EXAMPLES: Dict[str, List[str]] = {
+        "simple_payment": [
+            "Send $50 to Alice", "Pay Bob 20 dollars", "Transfer 100 USDC to 0x1234",
+            "Can you send my landlord $1200", "give sam 15 bucks"
+        ],
+        "batch_payment": [
+            "Send $5 to Alice, $10 to Bob and $20 to Carol", "Pay Sam 15 and Dana 30",
+            "Transfer 100 USDC to 0x1234 and 50 to 0x5678"
+        ],
+        "split_payment": [
+            "Split $300 4 ways", "Split the bill between 4 people",
+            "Divide $90 among me, Alice and Bob", "split dinner with 3 friends"
+        ],
+        "create_escrow": [
+            "Escrow $2000 for the freelance project", "Lock $500 until the work is delivered",
+            "Hold $1000 in escrow for 30 days"
+        ],
+        "release_escrow": [
+            "Release the escrow", "The work is done, release the funds", "Release escrow payment to the freelancer"
+        ],
+        "subscription": [
+            "Pay $15/month to Netflix", "Set up a weekly payment of $20 to Alice", "Send Bob $100 every month"
+        ],
+        "cancel_subscription": [
+            "Cancel my Netflix subscription", "Stop the monthly payment to Bob", "End my recurring payment"
+        ],
+        "balance_query": [
+            "Check my balance", "How much USDC do I have?", "What's left in my wallet", "show my funds"
+        ],
+        "history": [
+            "Show my transactions", "What did I pay last week?", "List my recent payments", "transaction history"
+        ],
+        "defi_invest": [
+            "Invest $500 in Aave", "Put my USDC into a yield vault", "Stake $1000 for interest"
+        ],
+        "help": [
+            "Help", "What can you do?", "How does this work?", "What commands are there?"
+        ],
+    }
+    
+    def __init__(
+        self,
+        llm: LLMClient,
+        index_dir: Optional[str] = None,
+        model: Optional[str] = None,
+        threshold: Optional[float] = None
+    ):
+        """
+        Initialize embedding classifier (the index is loaded by start())
+        
+        The index directory may be shared by several worker processes: writes
+        merge with the on-disk index under a file lock, and each worker reloads
+        when another one has replaced the files.
+        
+        Args:
+            llm: Shared LLM client used for embeddings
+            index_dir: Directory holding the index (falls back to AI_EMBEDDING_INDEX_DIR)
+            model: Embedding model (falls back to AI_EMBEDDING_MODEL)
+            threshold: Minimum cosine similarity to trust a match (falls back to AI_EMBEDDING_THRESHOLD)
+        """
+        self.llm = llm
+        self.index_dir = index_dir or os.getenv("AI_EMBEDDING_INDEX_DIR", "data/intent_index")
+        self.model = model or os.getenv("AI_EMBEDDING_MODEL", "text-embedding-3-small")
+        self.threshold = threshold if threshold is not None else float(os.getenv("AI_EMBEDDING_THRESHOLD", "0.78"))
+        
+        self.vectors: Optional[np.ndarray] = None  # (N, D) unit-normalized float32
+        self.labels: List[Dict[str, str]] = []     # [{"intent": ..., "text": ...}]
+        self._loaded_mtime: Optional[int] = None   # labels file mtime (ns) of the loaded index
+        self._lock = asyncio.Lock()
+    
+    async def start(self):
+        """
+        Load the index, seeding it first if it is empty
+        
+        Called once at startup, so no request waits on the file lock or on
+        embedding the seed examples.
+        """
+        await asyncio.to_thread(self.load)
+        if self.vectors is None:
+            await self.add_examples_bulk(self.SEED_EXAMPLES, only_if_empty=True)
+    
+    def load(self):
+        """Memory-map the index from disk, if one exists (blocks on the file lock)"""
+        with self._file_lock(fcntl.LOCK_SH):
+            index = self._read_index()
+        if index is not None:
+            self.vectors, self.labels, self._loaded_mtime = index
+    
+    async def reload_if_changed(self):
+        """Reload the index, off the event loop, if another process has rewritten it since it was loaded"""
+        try:
+            mtime = os.stat(os.path.join(self.index_dir, self.LABELS_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            await asyncio.to_thread(self.load)
+    
+    async def classify(self, user_message: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the closest labelled example to a message
+        
+        Args:
+            user_message: User's message/text command
+        
+        Returns:
+            Tuple of (intent value, similarity), or None below the confidence threshold
+            or before the index has been loaded
+        """
+        await self.reload_if_changed()
+        if self.vectors is None:
+            return None
+        
+        query = self._normalize(np.asarray(await self.llm.embed([user_message], self.model), dtype=np.float32))[0]
+        scores = self.vectors @ query
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        
+        if similarity < self.threshold:
+            return None
+        return self.labels[best]["intent"], similarity
+    
+    async def add_examples(self, intent: str, texts: List[str]) -> int:
+        """
+        Add labelled examples for an intent and persist the index
+        
+        Args:
+            intent: Intent value the examples belong to
+            texts: Example utterances
+        
+        Returns:
+            Total number of examples in the index
+        """
+        return await self.add_examples_bulk({intent: texts})
+    
+    async def add_examples_bulk(self, examples: Dict[str, List[str]], only_if_empty: bool = False) -> int:
+        """
+        Add labelled examples for several intents and persist the index
+        
+        Args:
+            examples: Mapping of intent value to example utterances
+            only_if_empty: Skip if another caller already populated the index
+        
+        Returns:
+            Total number of examples in the index
+        """
+        labels = [{"intent": intent, "text": text} for intent, texts in examples.items() for text in texts]
+        
+        async with self._lock:
+            await self.reload_if_changed()
+            if only_if_empty and self.vectors is not None:
+                return len(self.labels)
+            if not labels:
+                return len(self.labels)
+            
+            embeddings = await self.llm.embed([label["text"] for label in labels], self.model)
+            new_vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+            
+            # Blocking file lock and disk I/O run off the event loop
+            await asyncio.to_thread(self._merge_and_save, new_vectors, labels, only_if_empty)
+            await asyncio.to_thread(self.load)
+            
+            return len(self.labels)
+    
+    def _merge_and_save(self, new_vectors: np.ndarray, new_labels: List[Dict[str, str]], only_if_empty: bool):
+        """Append examples to the current on-disk index (not this worker's possibly stale copy)"""
+        with self._file_lock(fcntl.LOCK_EX):
+            index = self._read_index()
+            if index is not None:
+                if only_if_empty:
+                    return  # another worker seeded the index first
+                vectors, labels, _ = index
+                # Copy out of the memory map before the file is replaced
+                new_vectors = np.vstack([np.array(vectors), new_vectors])
+                new_labels = labels + new_labels
+            self._save(new_vectors, new_labels)
+    
+    def _read_index(self) -> Optional[Tuple[np.ndarray, List[Dict[str, str]], int]]:
+        """Read the on-disk index (caller holds the file lock)"""
+        vectors_path = os.path.join(self.index_dir, self.VECTORS_FILE)
+        labels_path = os.path.join(self.index_dir, self.LABELS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(labels_path)):
+            return None
+        
+        mtime = os.stat(labels_path).st_mtime_ns
+        with open(labels_path) as f:
+            labels = json.load(f)
+        return np.load(vectors_path, mmap_mode="r"), labels, mtime
+    
+    @contextmanager
+    def _file_lock(self, operation: int) -> Iterator[None]:
+        """Hold a shared (readers) or exclusive (writers) lock on the index directory"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(os.path.join(self.index_dir, self.LOCK_FILE), "a") as f:
+            fcntl.flock(f, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def _save(self, vectors: np.ndarray, labels: List[Dict[str, str]]):
+        """Write the index atomically so readers never see a partial file (caller holds the file lock)"""
+        vectors_path = os.path.join(self.index_dir, self.VECTORS_FILE)
+        labels_path = os.path.join(self.index_dir, self.LABELS_FILE)
+        
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(labels_path + ".tmp", "w") as f:
+            json.dump(labels, f)
+        
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(labels_path + ".tmp", labels_path)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length so a dot product is cosine similarity"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
@@ -1,29 +1,80 @@
 """
 Entity Extractor - Extracts amounts, addresses, and other entities from user messages
 """
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+import copy
 import json
+from src.ai.llm_client import get_llm_client
+from src.ai.local_entity_parser import LocalEntityParser
+from src.ai.model_router import ModelRouter, get_model_router
+from src.ai.prompts import EXTRACT_PROMPTS
+from src.ai.token_counter import count_tokens
+from src.services.cache_service import CacheService
+from src.utils.formatter import Formatter
+from src.utils.singleflight import SingleFlight
 
 
 class EntityExtractor:
     """Extracts entities from user messages"""
     
-    def __init__(self, openai_api_key: Optional[str] = None):
+    # Fields each intent needs before it can be acted on.
+    # Each group is satisfied when any one of its fields is present.
+    REQUIRED_FIELDS = {
+        "simple_payment": [("amount",), ("recipient",)],
+        "batch_payment": [("payments",)],
+        "split_payment": [("amount",), ("num_people", "recipients")],
+        "create_escrow": [("amount",)],
+        "subscription": [("amount",), ("frequency",)],
+        "defi_invest": [("amount",)],
+    }
+    
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        local_parser: Optional[LocalEntityParser] = None,
+        cache: Optional[CacheService] = None,
+        router: Optional[ModelRouter] = None
+    ):
         """Initialize entity extractor with OpenAI API key"""
-        if openai_api_key:
-            self.client = OpenAI(api_key=openai_api_key)
-        else:
-            import os
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OpenAI API key is required")
-            self.client = OpenAI(api_key=api_key)
+        # Shared, pooled client; falls back to the OPENAI_API_KEY environment variable
+        self.llm = get_llm_client(openai_api_key)
+        self.router = router or get_model_router()
+        self.local_parser = local_parser or LocalEntityParser()
+        self.cache = cache or CacheService()
+        self._inflight = SingleFlight()
+        
+        # Extractions served per path: "local", "cache", "llm", "degraded" (LLM circuit open)
+        self.path_counts: Counter = Counter()
+        
+        # LLM token usage per intent: calls, prompt_tokens, completion_tokens
+        self.token_usage: Dict[str, Counter] = defaultdict(Counter)
+    
+    @classmethod
+    def missing_fields(cls, intent: str, entities: Dict[str, Any]) -> List[str]:
+        """
+        List required fields for an intent that are not yet filled
+        
+        Args:
+            intent: Intent type (from Intent enum)
+            entities: Entities extracted so far
+            
+        Returns:
+            Missing field names (first field of each unsatisfied group)
+        """
+        return [
+            group[0]
+            for group in cls.REQUIRED_FIELDS.get(intent, [])
+            if not any(entities.get(field) for field in group)
+        ]
     
     async def extract(self, user_message: str, intent: str) -> Dict[str, Any]:
         """
         Extract entities from user message based on intent
         
+        The local parser runs first; the LLM is only called when required
+        fields for the intent are still missing.
+        
         Args:
             user_message: User's message/text command
             intent: Intent type (from Intent enum)
@@ -31,34 +82,133 @@ class EntityExtractor:
         Returns:
             Dictionary with extracted entities
         """
-        system_prompt = f"""Extract entities from the user's payment command.
-Intent: {intent}
-
-Return a JSON object with these fields (only include applicable fields):
-- amount: dollar amount (number)
-- recipient: recipient name/address/email (string)
-- recipients: list of recipients for split payments (array of strings)
-- num_people: number of people to split between (number)
-- frequency: for subscriptions (daily/weekly/monthly)
-- duration: escrow duration in days (number)
-- description: payment description/memo (string)
-- milestone: milestone description for escrow (string)
-
-Examples:
-Input: "Send $50 to alice@email.com"
-Output: {{"amount": 50, "recipient": "alice@email.com"}}
-
-Input: "Split $300 between 4 people"
-Output: {{"amount": 300, "num_people": 4}}
-
-Input: "Escrow $2000 for freelance project"
-Output: {{"amount": 2000, "description": "freelance project"}}
-
-Return ONLY valid JSON, no additional text."""
-
+        entities = self.local_parser.parse(user_message)
+        if not self.missing_fields(intent, entities):
+            self.path_counts["local"] += 1
+            return entities
+        
+        cache_key = f"entities:{intent}:{Formatter.normalize_message(user_message)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.path_counts["cache"] += 1
+            return copy.deepcopy(cached)
+        
+        # Circuit breaker open: answer with what the local parser found
+        if not self.llm.available:
+            self.path_counts["degraded"] += 1
+            return entities
+        
+        llm_entities = await self._extract_llm_once(cache_key, user_message, intent, bool(entities))
+        
+        # Locally parsed values are exact; the LLM fills in the rest
+        entities = {**llm_entities, **entities}
+        if llm_entities:
+            self.cache.set(cache_key, copy.deepcopy(entities))
+        return entities
+    
+    async def extract_any(self, user_message: str) -> Dict[str, Any]:
+        """
+        Extract every applicable entity without knowing the intent yet
+        
+        Used for speculative extraction while classification is still running.
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Dictionary with extracted entities
+        """
+        entities = self.local_parser.parse(user_message)
+        
+        cache_key = f"entities:any:{Formatter.normalize_message(user_message)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.path_counts["cache"] += 1
+            return copy.deepcopy(cached)
+        
+        if not self.llm.available:
+            self.path_counts["degraded"] += 1
+            return entities
+        
+        llm_entities = await self._extract_llm_once(cache_key, user_message, "unknown", bool(entities))
+        
+        entities = {**llm_entities, **entities}
+        if llm_entities:
+            self.cache.set(cache_key, copy.deepcopy(entities))
+        return entities
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-path extraction counters
+        
+        Returns:
+            Dictionary with counts per path and the local hit rate
+        """
+        total = sum(self.path_counts.values())
+        return {
+            "paths": dict(self.path_counts),
+            "total": total,
+            "local_hit_rate": self.path_counts["local"] / total if total else 0.0,
+            "tokens_by_intent": {
+                intent: {
+                    **usage,
+                    "avg_prompt_tokens": usage["prompt_tokens"] / usage["calls"],
+                    "avg_completion_tokens": usage["completion_tokens"] / usage["calls"]
+                }
+                for intent, usage in self.token_usage.items()
+            },
+            "coalescing": self._inflight.get_stats()
+        }
+    
+    def _record_tokens(self, intent: str, response: Any, prompt: str, completion: str):
+        """Add one completion's token usage to the per-intent totals (counted locally if not reported)"""
+        usage = getattr(response, "usage", None)
+        counts = self.token_usage[intent]
+        counts["calls"] += 1
+        counts["prompt_tokens"] += getattr(usage, "prompt_tokens", None) or count_tokens(prompt)
+        counts["completion_tokens"] += getattr(usage, "completion_tokens", None) or count_tokens(completion or "")
+    
+    async def _extract_llm_once(
+        self,
+        key: str,
+        user_message: str,
+        intent: str,
+        rule_parsed: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Extract entities with the LLM, sharing the call with identical in-flight requests
+        
+        Args:
+            key: Deduplication key
+            user_message: User's message/text command
+            intent: Intent type (from Intent enum)
+            rule_parsed: Whether the local parser already found some entities
+            
+        Returns:
+            Dictionary with extracted entities (a private copy)
+        """
+        entities = await self._inflight.do(key, lambda: self._extract_llm(user_message, intent, rule_parsed))
+        return copy.deepcopy(entities)
+    
+    async def _extract_llm(self, user_message: str, intent: str, rule_parsed: bool = False) -> Dict[str, Any]:
+        """
+        Extract entities from user message with the LLM
+        
+        Args:
+            user_message: User's message/text command
+            intent: Intent type (from Intent enum)
+            rule_parsed: Whether the local parser already found some entities
+            
+        Returns:
+            Dictionary with extracted entities
+        """
+        self.path_counts["llm"] += 1
+        system_prompt = EXTRACT_PROMPTS.get(intent, EXTRACT_PROMPTS["unknown"])
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await self.router.chat(
+                self.llm,
+                self.router.route("extract", user_message, intent=intent, rule_parsed=rule_parsed),
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_message}
@@ -68,6 +218,7 @@ Return ONLY valid JSON, no additional text."""
             )
             
             content = response.choices[0].message.content
+            self._record_tokens(intent, response, system_prompt + user_message, content)
             entities = json.loads(content)
             
             return entities
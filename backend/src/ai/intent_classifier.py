@@ -1,14 +1,32 @@
 """
 Intent Classifier - Classifies user messages into payment intents
 """
+import asyncio
+import copy
+import json
+import os
+from collections import Counter
 from enum import Enum
-from typing import Optional
-from openai import OpenAI
+from typing import Any, Dict, List, Optional, Tuple
+from src.ai.embedding_classifier import EmbeddingIntentClassifier
+from src.ai.llm_client import get_llm_client
+from src.ai.local_entity_parser import LocalEntityParser
+from src.ai.model_router import ModelRouter, get_model_router
+from src.ai.prompts import (
+    BATCH_CLASSIFY_PROMPT, BATCH_CLASSIFY_SCHEMA, CLASSIFY_AND_EXTRACT_PROMPT, CLASSIFY_PROMPT
+)
+from src.ai.rule_classifier import RuleBasedClassifier
+from src.services.cache_service import CacheService
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.formatter import Formatter
+from src.utils.micro_batcher import MicroBatcher
+from src.utils.singleflight import SingleFlight
 
 
 class Intent(Enum):
     """Intent types for user commands"""
     SIMPLE_PAYMENT = "simple_payment"
+    BATCH_PAYMENT = "batch_payment"
     SPLIT_PAYMENT = "split_payment"
     CREATE_ESCROW = "create_escrow"
     RELEASE_ESCROW = "release_escrow"
@@ -24,80 +42,412 @@ class Intent(Enum):
 class IntentClassifier:
     """Classifies user intent from natural language"""
     
-    def __init__(self, openai_api_key: Optional[str] = None):
-        """Initialize intent classifier with OpenAI API key"""
-        if openai_api_key:
-            self.client = OpenAI(api_key=openai_api_key)
-        else:
-            # Fallback to environment variable
-            import os
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OpenAI API key is required")
-            self.client = OpenAI(api_key=api_key)
+    # Intents that move money; degraded (keyword) and embedding classification never return these
+    FUNDS_INTENTS = {
+        Intent.SIMPLE_PAYMENT, Intent.BATCH_PAYMENT, Intent.SPLIT_PAYMENT, Intent.CREATE_ESCROW,
+        Intent.RELEASE_ESCROW, Intent.CREATE_SUBSCRIPTION, Intent.DEFI_INVEST
+    }
     
-    async def classify(self, user_message: str) -> Intent:
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        rule_classifier: Optional[RuleBasedClassifier] = None,
+        cache: Optional[CacheService] = None,
+        batch_classification: Optional[bool] = None,
+        embedding_classifier: Optional[EmbeddingIntentClassifier] = None,
+        router: Optional[ModelRouter] = None
+    ):
+        """
+        Initialize intent classifier with OpenAI API key
+        
+        Args:
+            openai_api_key: OpenAI API key
+            rule_classifier: Rule-based fast path classifier
+            cache: Response cache for LLM classifications
+            batch_classification: Micro-batch concurrent LLM classifications into one prompt
+                (defaults to the AI_BATCH_CLASSIFY env var)
+            embedding_classifier: Nearest-neighbour classifier tried before the LLM
+                (built automatically when AI_INTENT_BACKEND=embedding)
+            router: Picks the model and token budget per call (shared router by default)
+        """
+        # Shared, pooled client; falls back to the OPENAI_API_KEY environment variable
+        self.llm = get_llm_client(openai_api_key)
+        self.router = router or get_model_router()
+        self.rule_classifier = rule_classifier or RuleBasedClassifier()
+        self.local_parser = LocalEntityParser()  # degraded-mode entities for the fused path
+        self.cache = cache or CacheService()
+        self._inflight = SingleFlight()
+        
+        if embedding_classifier is None and os.getenv("AI_INTENT_BACKEND", "llm").lower() == "embedding":
+            embedding_classifier = EmbeddingIntentClassifier(self.llm)
+        self.embedding_classifier = embedding_classifier
+        
+        if batch_classification is None:
+            batch_classification = os.getenv("AI_BATCH_CLASSIFY", "false").lower() == "true"
+        self._batcher: Optional[MicroBatcher] = None
+        if batch_classification:
+            self._batcher = MicroBatcher(
+                self._classify_batch_llm,
+                max_batch_size=int(os.getenv("AI_BATCH_MAX_SIZE", "16")),
+                max_wait_ms=float(os.getenv("AI_BATCH_WINDOW_MS", "10"))
+            )
+        
+        # Classifications served per path: "rules", "embedding", "cache", "llm", "fused_llm",
+        # "degraded" (keyword fallback while the LLM circuit is open); "batch_retries" counts
+        # batched messages classified again on their own after a malformed batch answer
+        self.path_counts: Counter = Counter()
+    
+    def classify_fast(self, user_message: str) -> Optional[Intent]:
+        """
+        Classify user intent with the local rule set only
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Intent enum value, or None if the message is ambiguous
+        """
+        intent_str = self.rule_classifier.classify(user_message)
+        if intent_str is None:
+            return None
+        
+        self.path_counts["rules"] += 1
+        return Intent(intent_str)
+    
+    def classify_degraded(self, user_message: str) -> Intent:
+        """
+        Classify user intent locally with keyword matching, used while the LLM circuit is open
+        
+        Keyword matches cannot tell "send $50 to alice" from "don't send $50 to
+        alice", so intents that move money are never returned from here.
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Intent enum value (UNKNOWN for anything that would move money)
+        """
+        self.path_counts["degraded"] += 1
+        intent = Intent(self.rule_classifier.classify_lenient(user_message))
+        if intent in self.FUNDS_INTENTS:
+            return Intent.UNKNOWN
+        return intent
+    
+    async def classify_embedding(self, user_message: str) -> Optional[Intent]:
+        """
+        Classify user intent by nearest labelled example, if that backend is enabled
+        
+        Similarity cannot tell "pay bob 20 dollars" from "don't pay bob 20
+        dollars", so matches on intents that move money are left to the LLM.
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Intent enum value, or None if disabled, not confident enough or a money-moving intent
+        """
+        if self.embedding_classifier is None or not self.llm.available:
+            return None
+        
+        try:
+            match = await self.embedding_classifier.classify(user_message)
+        except Exception as e:
+            print(f"Error classifying intent by embedding: {e}")
+            return None
+        
+        if match is None:
+            return None
+        
+        intent = Intent(match[0])
+        if intent in self.FUNDS_INTENTS:
+            return None
+        
+        self.path_counts["embedding"] += 1
+        return intent
+    
+    async def classify(self, user_message: str, use_local: bool = True) -> Intent:
+        """
+        Classify user intent, trying local rules and the embedding index before GPT-4
+        
+        Args:
+            user_message: User's message/text command
+            use_local: Try the rule-based and embedding fast paths first
+            
+        Returns:
+            Intent enum value
+        """
+        if use_local:
+            intent = self.classify_fast(user_message) or await self.classify_embedding(user_message)
+            if intent is not None:
+                return intent
+        
+        cache_key = f"intent:{Formatter.normalize_message(user_message)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.path_counts["cache"] += 1
+            return Intent(cached)
+        
+        if not self.llm.available:
+            return self.classify_degraded(user_message)
+        
+        # Concurrent identical messages share one upstream call
+        return await self._inflight.do(
+            cache_key, lambda: self._classify_llm(user_message, cache_key)
+        )
+    
+    async def _classify_llm(self, user_message: str, cache_key: str) -> Intent:
         """
         Classify user intent using GPT-4
         
+        Args:
+            user_message: User's message/text command
+            cache_key: Cache key to store the result under
+            
+        Returns:
+            Intent enum value
+        """
+        self.path_counts["llm"] += 1
+        
+        try:
+            if self._batcher is not None:
+                intent = await self._batcher.submit(user_message)
+            else:
+                intent = await self._classify_single_llm(user_message)
+        except CircuitOpenError:
+            # Half-open circuit: only the probe call gets through, the rest degrade as if it were open
+            return self.classify_degraded(user_message)
+        except Exception as e:
+            print(f"Error classifying intent: {e}")
+            return Intent.UNKNOWN
+        
+        self.cache.set(cache_key, intent.value)
+        return intent
+    
+    async def _classify_single_llm(self, user_message: str) -> Intent:
+        """
+        Classify one message with its own GPT-4 completion
+        
         Args:
             user_message: User's message/text command
             
         Returns:
             Intent enum value
         """
-        system_prompt = """You are an intent classifier for a payment AI agent.
-Classify the user's message into one of these intents:
-- simple_payment: Send money to one person (e.g., "Send $50 to Alice")
-- split_payment: Split bill between multiple people (e.g., "Split $300 4 ways")
-- create_escrow: Lock money with conditions (e.g., "Escrow $2000")
-- release_escrow: Release locked money
-- subscription: Set up recurring payment (e.g., "Pay $15/month")
-- cancel_subscription: Cancel recurring payment
-- balance_query: Check USDC balance (e.g., "Check my balance")
-- history: View transaction history
-- defi_invest: Invest in DeFi protocols
-- help: Ask for help
-- unknown: Cannot determine intent
-
-Respond with ONLY the intent name (lowercase, no punctuation)."""
 
+        response = await self.router.chat(
+            self.llm,
+            self.router.route("classify", user_message),
+            messages=[
+                {"role": "system", "content": CLASSIFY_PROMPT},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.3
+        )
+        return self._parse_intent(response.choices[0].message.content)
+    
+    async def _classify_batch_llm(self, user_messages: List[str]) -> List[Intent]:
+        """
+        Classify a micro-batch of concurrent users' messages with one GPT-4 completion
+        
+        Each message goes in as one id-tagged element of a JSON array and must
+        come back under its own id with a valid intent (a strict output schema).
+        Any message whose answer is missing, duplicated or malformed is
+        classified again on its own, so one message cannot take over another's
+        answer.
+        
+        Args:
+            user_messages: User messages, in order
+            
+        Returns:
+            Intent enum values, in the same order
+        """
+        if len(user_messages) == 1:
+            return [await self._classify_single_llm(user_messages[0])]
+        
+        batch = json.dumps([{"id": index, "message": message} for index, message in enumerate(user_messages)])
+        route = self.router.route("batch_classify", batch)
+        response = await self.router.chat(
+            self.llm,
+            route,
+            messages=[
+                {"role": "system", "content": BATCH_CLASSIFY_PROMPT},
+                {"role": "user", "content": batch}
+            ],
+            temperature=0.3,
+            max_tokens=route.get("max_tokens", 20) + 15 * len(user_messages),
+            response_format={"type": "json_schema", "json_schema": BATCH_CLASSIFY_SCHEMA}
+        )
+        
+        intents: Dict[int, Intent] = {}
+        duplicates = set()
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Using mini for faster responses
+            results = json.loads(response.choices[0].message.content).get("results")
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"Error parsing batch classification: {e}")
+            results = None
+        for result in results if isinstance(results, list) else []:
+            index = result.get("id") if isinstance(result, dict) else None
+            if not isinstance(index, int) or not 0 <= index < len(user_messages):
+                continue
+            try:
+                intent = Intent(result.get("intent"))
+            except ValueError:
+                continue
+            if index in intents:
+                duplicates.add(index)
+            intents[index] = intent
+        
+        retry = [index for index in range(len(user_messages)) if index not in intents or index in duplicates]
+        if retry:
+            self.path_counts["batch_retries"] += len(retry)
+            retried = await asyncio.gather(*(self._classify_single_llm(user_messages[index]) for index in retry))
+            intents.update(zip(retry, retried))
+        return [intents[index] for index in range(len(user_messages))]
+    
+    async def classify_and_extract(self, user_message: str) -> Tuple[Intent, Dict[str, Any]]:
+        """
+        Classify intent and extract entities in a single completion
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Tuple of (Intent enum value, entities dictionary)
+        """
+        normalized = Formatter.normalize_message(user_message)
+        cached_intent = self.cache.get(f"intent:{normalized}")
+        if cached_intent is not None:
+            cached_entities = self.cache.get(f"entities:{cached_intent}:{normalized}")
+            if cached_entities is not None:
+                self.path_counts["cache"] += 1
+                return Intent(cached_intent), copy.deepcopy(cached_entities)
+        
+        if not self.llm.available:
+            return self._classify_and_extract_degraded(user_message)
+        
+        intent, entities = await self._inflight.do(
+            f"fused:{normalized}",
+            lambda: self._classify_and_extract_llm(user_message, normalized)
+        )
+        return intent, copy.deepcopy(entities)
+    
+    async def _classify_and_extract_llm(
+        self,
+        user_message: str,
+        normalized: str
+    ) -> Tuple[Intent, Dict[str, Any]]:
+        """
+        Classify intent and extract entities with one GPT-4 completion
+        
+        Args:
+            user_message: User's message/text command
+            normalized: Normalized message used for cache keys
+            
+        Returns:
+            Tuple of (Intent enum value, entities dictionary)
+        """
+        self.path_counts["fused_llm"] += 1
+        
+        try:
+            route = self.router.route("fused", user_message)
+            response = await self.router.chat(
+                self.llm,
+                route,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": CLASSIFY_AND_EXTRACT_PROMPT},
                     {"role": "user", "content": user_message}
                 ],
                 temperature=0.3,
-                max_tokens=50
+                response_format={"type": "json_object"}
             )
             
-            intent_str = response.choices[0].message.content.strip().lower()
+            content = json.loads(response.choices[0].message.content)
+            intent = self._parse_intent(str(content.get("intent", "")))
+            entities = content.get("entities") or {}
+            if not isinstance(entities, dict):
+                entities = {}
             
-            # Remove any punctuation
-            intent_str = intent_str.replace(".", "").replace(",", "").replace("!", "").replace("?", "")
+            # Share cache entries with classify() and EntityExtractor.extract()
+            self.cache.set(f"intent:{normalized}", intent.value)
+            self.cache.set(f"entities:{intent.value}:{normalized}", copy.deepcopy(entities))
             
-            try:
-                return Intent(intent_str)
-            except ValueError:
-                # Try to match similar intents
-                if "payment" in intent_str or "send" in intent_str or "transfer" in intent_str:
-                    return Intent.SIMPLE_PAYMENT
-                elif "split" in intent_str:
-                    return Intent.SPLIT_PAYMENT
-                elif "escrow" in intent_str:
-                    return Intent.CREATE_ESCROW
-                elif "balance" in intent_str or "check" in intent_str:
-                    return Intent.BALANCE_QUERY
-                elif "history" in intent_str or "transaction" in intent_str:
-                    return Intent.TRANSACTION_HISTORY
-                elif "help" in intent_str:
-                    return Intent.HELP
-                else:
-                    return Intent.UNKNOWN
-                    
+            return intent, entities
+            
+        except CircuitOpenError:
+            # Half-open circuit: only the probe call gets through, the rest degrade as if it were open
+            return self._classify_and_extract_degraded(user_message)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON from fused classifier: {e}")
+            return Intent.UNKNOWN, {}
         except Exception as e:
-            print(f"Error classifying intent: {e}")
-            return Intent.UNKNOWN
-
+            print(f"Error classifying and extracting: {e}")
+            return Intent.UNKNOWN, {}
+    
+    def _classify_and_extract_degraded(self, user_message: str) -> Tuple[Intent, Dict[str, Any]]:
+        """
+        Classify and extract with local keyword matching and the local parser only
+        
+        Args:
+            user_message: User's message/text command
+            
+        Returns:
+            Tuple of (Intent enum value, entities dictionary)
+        """
+        intent = self.classify_degraded(user_message)
+        if intent in (Intent.HELP, Intent.BALANCE_QUERY, Intent.TRANSACTION_HISTORY, Intent.UNKNOWN):
+            return intent, {}
+        return intent, self.local_parser.parse(user_message)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-path classification counters
+        
+        Returns:
+            Dictionary with counts per path and the rule hit rate
+        """
+        total = sum(self.path_counts.values())
+        return {
+            "paths": dict(self.path_counts),
+            "total": total,
+            "rule_hit_rate": self.path_counts["rules"] / total if total else 0.0,
+            "embedding_hit_rate": self.path_counts["embedding"] / total if total else 0.0,
+            "degraded_rate": self.path_counts["degraded"] / total if total else 0.0,
+            "cache": self.cache.get_stats(),
+            "coalescing": self._inflight.get_stats(),
+            "batching": self._batcher.get_stats() if self._batcher else None
+        }
+    
+    @staticmethod
+    def _parse_intent(raw_intent: str) -> Intent:
+        """
+        Map a model's intent answer onto the Intent enum
+        
+        Args:
+            raw_intent: Intent name as returned by the model
+            
+        Returns:
+            Intent enum value
+        """
+        intent_str = raw_intent.strip().lower()
+        
+        # Remove any punctuation
+        intent_str = intent_str.replace(".", "").replace(",", "").replace("!", "").replace("?", "")
+        
+        try:
+            return Intent(intent_str)
+        except ValueError:
+            # Try to match similar intents
+            if "payment" in intent_str or "send" in intent_str or "transfer" in intent_str:
+                return Intent.SIMPLE_PAYMENT
+            elif "split" in intent_str:
+                return Intent.SPLIT_PAYMENT
+            elif "escrow" in intent_str:
+                return Intent.CREATE_ESCROW
+            elif "balance" in intent_str or "check" in intent_str:
+                return Intent.BALANCE_QUERY
+            elif "history" in intent_str or "transaction" in intent_str:
+                return Intent.TRANSACTION_HISTORY
+            elif "help" in intent_str:
+                return Intent.HELP
+            else:
+                return Intent.UNKNOWN
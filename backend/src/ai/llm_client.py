@@ -0,0 +1,257 @@
+"""
+LLM Client - Non-blocking OpenAI client with per-call timeouts and a concurrency cap
+
+Clients are shared process-wide through get_llm_client() so every AI component
+reuses one keep-alive connection pool instead of opening its own.
+"""
+import asyncio
+import importlib.util
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, List, Optional
+import httpx
+from openai import AsyncOpenAI
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class LLMClient:
+    """Async wrapper around the OpenAI chat completions API"""
+    
+    DEFAULT_TIMEOUT = 15.0          # seconds per completion
+    DEFAULT_MAX_CONCURRENCY = 256   # in-flight completions per worker
+    DEFAULT_MAX_CONNECTIONS = 100
+    DEFAULT_KEEPALIVE_CONNECTIONS = 20
+    DEFAULT_KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept
+    HEDGE_MIN_SAMPLES = 20          # latencies observed before hedging kicks in
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        """
+        Initialize LLM client
+        
+        Args:
+            api_key: OpenAI API key (falls back to OPENAI_API_KEY)
+            timeout: Default per-call timeout in seconds (falls back to OPENAI_TIMEOUT)
+            max_concurrency: Max in-flight completions (falls back to OPENAI_MAX_CONCURRENCY)
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OpenAI API key is required")
+        
+        self.timeout = timeout or float(os.getenv("OPENAI_TIMEOUT", self.DEFAULT_TIMEOUT))
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("OPENAI_MAX_CONCURRENCY", self.DEFAULT_MAX_CONCURRENCY)
+        )
+        
+        self.http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", self.DEFAULT_MAX_CONNECTIONS)),
+                max_keepalive_connections=int(
+                    os.getenv("OPENAI_KEEPALIVE_CONNECTIONS", self.DEFAULT_KEEPALIVE_CONNECTIONS)
+                ),
+                keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", self.DEFAULT_KEEPALIVE_EXPIRY))
+            ),
+            timeout=self.timeout
+        )
+        self.client = AsyncOpenAI(api_key=api_key, timeout=self.timeout, http_client=self.http_client)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Hedging: after the Nth-percentile latency, race a second identical request
+        self.hedging = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+        self.hedge_budget = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))  # max hedges per request
+        self._latencies: deque = deque(maxlen=500)
+        self.stats: Dict[str, int] = {"requests": 0, "hedges": 0, "hedge_wins": 0, "hedges_over_budget": 0}
+        
+        # Circuit breaker: fail fast while the API is erroring or slow
+        self.breaker = CircuitBreaker(
+            window_size=int(os.getenv("LLM_BREAKER_WINDOW", "50")),
+            min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "10")),
+            failure_rate_threshold=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "5")),
+            open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+        )
+    
+    @property
+    def available(self) -> bool:
+        """Whether calls are currently expected to go through (breaker not open)"""
+        return self.breaker.state != CircuitBreaker.OPEN
+    
+    async def chat(self, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Create a chat completion without blocking the event loop
+        
+        The timeout covers both waiting for a concurrency slot and the request
+        itself. Cancelling the awaiting task cancels the HTTP request too.
+        
+        Args:
+            timeout: Per-call timeout in seconds (defaults to the client timeout)
+            **kwargs: Arguments for chat.completions.create
+        
+        Returns:
+            Chat completion response
+        
+        Raises:
+            asyncio.TimeoutError: If the call does not finish in time
+            CircuitOpenError: If the circuit breaker is rejecting calls
+        """
+        return await self._guarded(self._chat_hedged(**kwargs), timeout)
+    
+    async def _guarded(self, call: Awaitable[Any], timeout: Optional[float]) -> Any:
+        """Run a call under the per-call timeout and record its outcome in the circuit breaker"""
+        if not self.breaker.allow():
+            call.close()
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call, timeout=timeout or self.timeout)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - start)
+            raise
+        self.breaker.record(True, time.monotonic() - start)
+        return result
+    
+    async def _chat_hedged(self, **kwargs) -> Any:
+        """Run a completion, hedging with a duplicate request if it is slower than usual"""
+        self.stats["requests"] += 1
+        start = time.monotonic()
+        
+        delay = self._hedge_delay()
+        if delay is None:
+            response = await self._chat(**kwargs)
+            self._latencies.append(time.monotonic() - start)
+            return response
+        
+        primary = asyncio.ensure_future(self._chat(**kwargs))
+        hedge: Optional[asyncio.Future] = None
+        # Each request's own start time, so a winning hedge is timed from when it was sent
+        started = {primary: start}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                if self.stats["hedges"] < self.hedge_budget * self.stats["requests"]:
+                    self.stats["hedges"] += 1
+                    hedge = asyncio.ensure_future(self._chat(**kwargs))
+                    started[hedge] = time.monotonic()
+                else:
+                    self.stats["hedges_over_budget"] += 1
+            
+            pending = {primary, hedge} - {None}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Any success wins; fall back to the other request if the first to finish failed
+                succeeded = [task for task in done if task.exception() is None]
+                if not succeeded and pending:
+                    continue
+                task = succeeded[0] if succeeded else next(iter(done))
+                if task is hedge and succeeded:
+                    self.stats["hedge_wins"] += 1
+                response = task.result()
+                self._latencies.append(time.monotonic() - started[task])
+                return response
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or not yet calibrated"""
+        if not self.hedging or len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100))
+        return latencies[index]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request and hedging statistics
+        
+        Returns:
+            Dictionary with request/hedge counts, hedge rate, current hedge delay and breaker state
+        """
+        return {
+            **self.stats,
+            "hedge_rate": self.stats["hedges"] / self.stats["requests"] if self.stats["requests"] else 0.0,
+            "hedge_delay": self._hedge_delay(),
+            "circuit_breaker": self.breaker.get_stats()
+        }
+    
+    async def _chat(self, **kwargs) -> Any:
+        """Run one completion inside the concurrency cap"""
+        async with self._semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+    
+    async def embed(self, texts: List[str], model: str, timeout: Optional[float] = None) -> List[List[float]]:
+        """
+        Embed texts without blocking the event loop
+        
+        Args:
+            texts: Texts to embed
+            model: Embedding model name
+            timeout: Per-call timeout in seconds (defaults to the client timeout)
+            
+        Returns:
+            One embedding vector per text, in order
+        
+        Raises:
+            CircuitOpenError: If the circuit breaker is rejecting calls
+        """
+        return await self._guarded(self._embed(texts, model), timeout)
+    
+    async def _embed(self, texts: List[str], model: str) -> List[List[float]]:
+        """Run one embeddings request inside the concurrency cap"""
+        async with self._semaphore:
+            response = await self.client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    async def warm_up(self):
+        """Open a pooled connection (TLS + HTTP/2 handshake) ahead of the first chat"""
+        try:
+            await asyncio.wait_for(self.client.models.list(), timeout=self.timeout)
+        except Exception as e:
+            print(f"Error warming up LLM client: {e}")
+    
+    async def close(self):
+        """Close the underlying connection pool"""
+        await self.http_client.aclose()
+
+
+# Process-wide registry, keyed by API key
+_clients: Dict[str, LLMClient] = {}
+
+
+def get_llm_client(api_key: Optional[str] = None) -> LLMClient:
+    """
+    Get the shared LLM client for an API key
+    
+    Args:
+        api_key: OpenAI API key (falls back to OPENAI_API_KEY)
+    
+    Returns:
+        Shared LLMClient instance
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key is required")
+    
+    if api_key not in _clients:
+        _clients[api_key] = LLMClient(api_key=api_key)
+    return _clients[api_key]
+
+
+async def close_llm_clients():
+    """Close every registered LLM client"""
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
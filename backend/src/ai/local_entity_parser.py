@@ -0,0 +1,279 @@
+"""
+Local Entity Parser - Deterministic extraction of amounts, addresses, emails and counts
+"""
+import re
+from typing import Any, Dict, List, Optional, Set
+
+
+class LocalEntityParser:
+    """Parses common entities from user messages without calling the LLM"""
+    
+    ADDRESS_PATTERN = re.compile(r"\b0x[a-fA-F0-9]{40}\b")
+    EMAIL_PATTERN = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+    AMOUNT_PATTERNS = [
+        re.compile(r"\$\s?(\d[\d,]*(?:\.\d+)?)\s*(k)?\b", re.IGNORECASE),
+        re.compile(r"\b(\d[\d,]*(?:\.\d+)?)\s*(k)?\s*(?:usdc|usd|dollars?|bucks)\b", re.IGNORECASE),
+        re.compile(r"^(?:send|pay|transfer|split|escrow)\s+(?:\w+\s+)?(\d[\d,]*(?:\.\d+)?)\s*(k)?\b", re.IGNORECASE),
+    ]
+    # Amounts in another currency or token ("5 eth", "€20"); the agent only moves USDC
+    OTHER_CURRENCY_PATTERN = re.compile(
+        r"\b\d[\d,]*(?:\.\d+)?\s*(?:k\s*)?(?:eth|ether|btc|bitcoin|sol|matic|usdt|dai|eurc?|euros?|gbp"
+        r"|pounds?|yen|jpy|tokens?|coins?)\b|[€£¥]\s?\d",
+        re.IGNORECASE
+    )
+    NUM_PEOPLE_PATTERNS = [
+        re.compile(r"\b(\d+|two|three|four|five|six|seven|eight|nine|ten)\s+ways\b", re.IGNORECASE),
+        re.compile(r"\b(?:between|among|amongst)\s+(\d+|two|three|four|five|six|seven|eight|nine|ten)\b", re.IGNORECASE),
+        re.compile(r"\b(\d+|two|three|four|five|six|seven|eight|nine|ten)\s+(?:people|persons|friends)\b", re.IGNORECASE),
+    ]
+    NAMED_RECIPIENTS_PATTERN = re.compile(
+        r"\b(?:between|among|amongst|with)\s+([a-z][\w.-]*(?:\s*,\s*[a-z][\w.-]*)*\s*,?\s+and\s+[a-z][\w.-]*)",
+        re.IGNORECASE
+    )
+    NAMED_RECIPIENT_PATTERNS = [
+        re.compile(r"\bto\s+@?([a-z][\w.-]*)", re.IGNORECASE),
+        re.compile(r"^(?:send|pay|transfer)\s+@?([a-z][\w.-]*)\s+(?:\$|\d)", re.IGNORECASE),
+    ]
+    # "to alice and bob", "to alice, bob": more than one payee for a single amount
+    MULTIPLE_RECIPIENTS_PATTERN = re.compile(
+        r"\bto\s+@?[\w.+@-]+\s*(?:,|&|\band\b|\bor\b)\s*(?:to\s+)?@?[a-z0-9]",
+        re.IGNORECASE
+    )
+    FREQUENCY_PATTERN = re.compile(
+        r"\b(daily|weekly|monthly|yearly|annually)\b"
+        r"|(?:\b(?:per|a|an|each|every)\s+|/\s*)(day|week|month|year)\b",
+        re.IGNORECASE
+    )
+    DURATION_PATTERN = re.compile(r"\b(?:for|in|within)\s+(\d+)\s*(day|week|month)s?\b", re.IGNORECASE)
+    DESCRIPTION_PATTERN = re.compile(
+        r"\b(?:for|memo:?)\s+(?!\d)(.+?)(?=\s+(?:to|between|among|with|every|each|per|for)\b|[.!?]*$)",
+        re.IGNORECASE
+    )
+    
+    # Bare follow-up replies ("50", "$50", "to @alice", "0xabc...") answering a missing slot
+    BARE_NUMBER_PATTERN = re.compile(r"^\$?\s?(\d[\d,]*(?:\.\d+)?)\s*(k)?\W*$", re.IGNORECASE)
+    BARE_RECIPIENT_PATTERN = re.compile(r"^to\s+@?([a-z][\w.-]*)\W*$", re.IGNORECASE)
+    # Follow-ups that only call off the pending request ("cancel", "no", "never mind");
+    # "stop my netflix subscription" is a new request, not a cancellation
+    CANCEL_PATTERN = re.compile(
+        r"^(?:no|nope|nah|cancel|stop|abort|quit|nevermind|never\s*mind|forget\s+(?:it|that)"
+        r"|don'?t|do\s+not|wait|hold\s+on)\W*$",
+        re.IGNORECASE
+    )
+    
+    # "<amount> to <recipient>" pairs in multi-payment messages ("send $5 to A, $10 to B and $20 to C")
+    PAYMENT_PAIR_PATTERN = re.compile(
+        r"\$\s?(\d[\d,]*(?:\.\d+)?)\s*(k)?(?:\s*(?:usdc|usd|dollars?|bucks))?"
+        r"|\b(\d[\d,]*(?:\.\d+)?)\s*(k)?\s*(?:usdc|usd|dollars?|bucks)"
+        r"(?=\s+to\s)",
+        re.IGNORECASE
+    )
+    PAIR_RECIPIENT_PATTERN = re.compile(
+        r"\s*to\s+@?(0x[a-fA-F0-9]{40}\b|[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b|[a-z][\w.-]*)",
+        re.IGNORECASE
+    )
+    MULTI_PAYMENT_PREFIX = re.compile(r"^(?:please\s+)?(?:send|pay|transfer)\s+", re.IGNORECASE)
+    # Only list separators may sit between pairs; anything else ("instead of", "not",
+    # "every month", "actually") changes the meaning and is left to the LLM
+    PAIR_SEPARATOR_PATTERN = re.compile(r"\s*(?:[,;]\s*(?:and\s+)?|\s+and\s+)", re.IGNORECASE)
+    PAIRS_END_PATTERN = re.compile(r"\s*[.!]*\s*$")
+    MAX_BATCH_PAYMENTS = 100  # PaymentRouter.batchPayments limit
+    
+    WORD_NUMBERS = {
+        "two": 2, "three": 3, "four": 4, "five": 5,
+        "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+    }
+    FREQUENCIES = {
+        "daily": "daily", "day": "daily",
+        "weekly": "weekly", "week": "weekly",
+        "monthly": "monthly", "month": "monthly",
+        "yearly": "yearly", "annually": "yearly", "year": "yearly"
+    }
+    DURATION_DAYS = {"day": 1, "week": 7, "month": 30}
+    
+    # Words that follow "to" / "pay" but are not recipients
+    NOT_RECIPIENTS = {
+        "my", "me", "the", "a", "an", "him", "her", "them", "someone", "everyone",
+        "split", "check", "send", "pay", "be", "do"
+    }
+    # In a strict "<amount> to <name>" list a single letter is a name ("$5 to A, $10 to B")
+    NOT_PAIR_RECIPIENTS = NOT_RECIPIENTS - {"a"}
+    
+    def parse(self, user_message: str) -> Dict[str, Any]:
+        """
+        Parse entities from a user message
+        
+        Args:
+            user_message: User's message/text command
+        
+        Returns:
+            Dictionary with the entities found (same shape as EntityExtractor)
+        """
+        text = " ".join(user_message.split())
+        entities: Dict[str, Any] = {}
+        
+        amount = self._parse_amount(text)
+        if amount is not None:
+            entities["amount"] = amount
+        
+        recipients = self.ADDRESS_PATTERN.findall(text) + self.EMAIL_PATTERN.findall(text)
+        if not recipients:
+            named = self.NAMED_RECIPIENTS_PATTERN.search(text)
+            if named:
+                recipients = [
+                    name for name in re.split(r"\s*,\s*|\s+and\s+", named.group(1).strip())
+                    if name and name.lower() not in self.NOT_RECIPIENTS
+                ]
+        if len(recipients) > 1:
+            entities["recipients"] = recipients
+        elif self.MULTIPLE_RECIPIENTS_PATTERN.search(text):
+            pass  # ambiguous: leave the recipient for the LLM rather than keep only the first
+        elif recipients:
+            entities["recipient"] = recipients[0]
+        else:
+            recipient = self._parse_named_recipient(text)
+            if recipient:
+                entities["recipient"] = recipient
+        
+        num_people = self._parse_num_people(text)
+        if num_people is not None:
+            entities["num_people"] = num_people
+        elif len(recipients) > 1:
+            entities["num_people"] = len(recipients)
+        
+        frequency = self.FREQUENCY_PATTERN.search(text)
+        if frequency:
+            entities["frequency"] = self.FREQUENCIES[(frequency.group(1) or frequency.group(2)).lower()]
+        
+        duration = self.DURATION_PATTERN.search(text)
+        if duration:
+            entities["duration"] = int(duration.group(1)) * self.DURATION_DAYS[duration.group(2).lower()]
+        
+        description = self.DESCRIPTION_PATTERN.search(text)
+        if description:
+            entities["description"] = description.group(1).strip()
+        
+        return entities
+    
+    def parse_payments(self, user_message: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Decompose a message carrying several payments into one entry per payment
+        
+        Args:
+            user_message: User's message/text command
+        
+        Returns:
+            List of {"amount", "recipient"} dictionaries, or None unless the whole
+            send/pay/transfer message is a list of 2 to MAX_BATCH_PAYMENTS
+            "<amount> to <recipient>" pairs joined only by ",", ";" or "and"
+        """
+        text = " ".join(user_message.split())
+        prefix = self.MULTI_PAYMENT_PREFIX.match(text)
+        if not prefix:
+            return None
+        
+        payments = []
+        position = prefix.end()
+        while True:
+            match = self.PAYMENT_PAIR_PATTERN.match(text, position)
+            recipient = match and self.PAIR_RECIPIENT_PATTERN.match(text, match.end())
+            if not recipient:
+                return None
+            name = recipient.group(1).rstrip(".")
+            if name.lower() in self.NOT_PAIR_RECIPIENTS:
+                return None
+            
+            amount = float((match.group(1) or match.group(3)).replace(",", ""))
+            if match.group(2) or match.group(4):
+                amount *= 1000
+            payments.append({"amount": amount, "recipient": name})
+            if len(payments) > self.MAX_BATCH_PAYMENTS:
+                return None
+            
+            position = recipient.end()
+            if self.PAIRS_END_PATTERN.match(text, position):
+                break
+            separator = self.PAIR_SEPARATOR_PATTERN.match(text, position)
+            if not separator:
+                return None
+            position = separator.end()
+        
+        return payments if len(payments) > 1 else None
+    
+    def parse_slots(self, user_message: str, slots: Set[str]) -> Dict[str, Any]:
+        """
+        Parse a follow-up reply to a request for specific missing fields
+        
+        Bare numbers ("50") are assigned to the missing slot they fit. A recipient
+        is only taken from an address, an email or an explicit "to alice", never
+        from a lone word such as "cancel".
+        
+        Args:
+            user_message: User's follow-up message
+            slots: Field names still missing
+        
+        Returns:
+            Dictionary with the entities found
+        """
+        text = " ".join(user_message.split())
+        entities = self.parse(text)
+        
+        recipient = entities.get("recipient")
+        if recipient and not (self.ADDRESS_PATTERN.fullmatch(recipient) or self.EMAIL_PATTERN.fullmatch(recipient)):
+            del entities["recipient"]
+        
+        number = self.BARE_NUMBER_PATTERN.match(text)
+        if number:
+            value = float(number.group(1).replace(",", "")) * (1000 if number.group(2) else 1)
+            if "amount" in slots:
+                entities.setdefault("amount", value)
+            elif "num_people" in slots and value.is_integer():
+                entities.setdefault("num_people", int(value))
+        
+        name = self.BARE_RECIPIENT_PATTERN.match(text)
+        if name and "recipient" in slots and name.group(1).lower() not in self.NOT_RECIPIENTS:
+            entities.setdefault("recipient", name.group(1).rstrip(".,!?"))
+        
+        return entities
+    
+    def is_cancellation(self, user_message: str) -> bool:
+        """
+        Check whether a follow-up reply calls off the pending request
+        
+        Args:
+            user_message: User's follow-up message
+        
+        Returns:
+            True for bare replies like "cancel", "no", "stop" or "never mind"
+        """
+        return bool(self.CANCEL_PATTERN.match(" ".join(user_message.split())))
+    
+    def _parse_amount(self, text: str) -> Optional[float]:
+        """Parse the first USD/USDC amount in the text (None if any amount is in another currency)"""
+        if self.OTHER_CURRENCY_PATTERN.search(text):
+            return None
+        for pattern in self.AMOUNT_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                amount = float(match.group(1).replace(",", ""))
+                if match.group(2):
+                    amount *= 1000
+                return amount
+        return None
+    
+    def _parse_num_people(self, text: str) -> Optional[int]:
+        """Parse "N ways" / "between N" / "N people" counts"""
+        for pattern in self.NUM_PEOPLE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                value = match.group(1).lower()
+                return self.WORD_NUMBERS.get(value) or int(value)
+        return None
+    
+    def _parse_named_recipient(self, text: str) -> Optional[str]:
+        """Parse a single recipient given by name ("to Alice", "pay Bob $20")"""
+        for pattern in self.NAMED_RECIPIENT_PATTERNS:
+            match = pattern.search(text)
+            if match and match.group(1).lower() not in self.NOT_RECIPIENTS:
+                return match.group(1).rstrip(".,!?")
+        return None
@@ -0,0 +1,257 @@
+"""
+Model Router - Picks the model and token budget for each LLM call from cheap request signals
+
+Routes are matched in order; the first route whose conditions all hold wins.
+Rules come from the JSON file named by AI_ROUTING_RULES (reloaded when the
+file changes) or from the built-in routes.
+"""
+import json
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+from src.ai.llm_client import LLMClient
+from src.utils.stage_metrics import record_usage
+
+
+# Intent value -> family, usable as a routing condition
+INTENT_FAMILIES: Dict[str, str] = {
+    "simple_payment": "payment",
+    "batch_payment": "payment",
+    "split_payment": "payment",
+    "subscription": "payment",
+    "cancel_subscription": "payment",
+    "create_escrow": "escrow",
+    "release_escrow": "escrow",
+    "defi_invest": "defi",
+    "balance_query": "query",
+    "history": "query",
+    "help": "query",
+    "unknown": "unknown",
+}
+
+
+class ModelRouter:
+    """Routes LLM calls to a model and max_tokens, and records per-route latency and token usage"""
+    
+    DEFAULT_MODEL = "gpt-4o-mini"
+    DEFAULT_MAX_TOKENS = 200
+    LONG_MESSAGE_LENGTH = 200
+    RELOAD_CHECK_SECONDS = 5.0
+    
+    def __init__(
+        self,
+        rules_path: Optional[str] = None,
+        default_model: Optional[str] = None,
+        large_model: Optional[str] = None
+    ):
+        """
+        Initialize model router
+        
+        Models are read from the environment here, not at import, so values
+        loaded from .env after the module is imported still apply.
+        
+        Args:
+            rules_path: JSON file with {"routes": [...], "default": {...}}
+                (falls back to AI_ROUTING_RULES; built-in routes when unset)
+            default_model: Model for built-in routes (falls back to AI_MODEL)
+            large_model: Model for built-in routes on long messages (falls back to AI_LARGE_MODEL;
+                opt-in, long messages stay on the default model when unset)
+        """
+        self.rules_path = rules_path or os.getenv("AI_ROUTING_RULES")
+        self.default_model = default_model or os.getenv("AI_MODEL") or self.DEFAULT_MODEL
+        self.large_model = large_model or os.getenv("AI_LARGE_MODEL") or self.default_model
+        self.routes: List[Dict[str, Any]] = self._default_routes()
+        self.fallback: Dict[str, Any] = self._default_fallback()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        
+        # Per-route metrics
+        self.metrics: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        )
+        self._latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=500))
+        
+        self.reload()
+    
+    def _default_routes(self) -> List[Dict[str, Any]]:
+        """
+        Built-in routes, used when no rules file is configured
+        
+        Conditions: task, intent, family, min_length, max_length, rule_parsed
+        """
+        return [
+            # Same budget as the original single-model classifier call
+            {"name": "classify", "task": "classify", "model": self.default_model, "max_tokens": 50},
+            {"name": "batch_classify", "task": "batch_classify", "model": self.default_model, "max_tokens": 20},
+            # The local parser already found some fields; the LLM only fills the gaps
+            {"name": "extract_fill", "task": "extract", "rule_parsed": True, "max_length": self.LONG_MESSAGE_LENGTH,
+             "model": self.default_model, "max_tokens": 100},
+            # Long messages usually carry several payments or conditions: a larger budget (and model, if set)
+            {"name": "extract_long", "task": "extract", "min_length": self.LONG_MESSAGE_LENGTH,
+             "model": self.large_model, "max_tokens": 400},
+            {"name": "extract", "task": "extract", "model": self.default_model, "max_tokens": 200},
+            {"name": "fused_long", "task": "fused", "min_length": self.LONG_MESSAGE_LENGTH,
+             "model": self.large_model, "max_tokens": 400},
+            {"name": "fused", "task": "fused", "model": self.default_model, "max_tokens": 250},
+        ]
+    
+    def _default_fallback(self) -> Dict[str, Any]:
+        """Route used when no route matches"""
+        return {"name": "default", "model": self.default_model, "max_tokens": self.DEFAULT_MAX_TOKENS}
+    
+    def reload(self) -> int:
+        """
+        Reload routing rules from the rules file, keeping the current rules on error
+        
+        Returns:
+            Number of active routes
+        """
+        self._checked_at = time.monotonic()
+        if not self.rules_path:
+            return len(self.routes)
+        
+        try:
+            self._mtime = os.path.getmtime(self.rules_path)
+            with open(self.rules_path) as f:
+                config = json.load(f)
+            
+            routes = config.get("routes") or []
+            fallback = {**self._default_fallback(), **(config.get("default") or {})}
+            fallback["max_tokens"] = fallback.get("max_tokens") or self.DEFAULT_MAX_TOKENS
+            for index, route in enumerate(routes):
+                route.setdefault("name", f"route_{index}")
+                route.setdefault("model", self.default_model)
+                if not route.get("max_tokens"):
+                    route["max_tokens"] = fallback["max_tokens"]
+            self.routes = routes
+            self.fallback = fallback
+        except Exception as e:
+            print(f"Error loading routing rules from {self.rules_path}: {e}")
+        
+        return len(self.routes)
+    
+    def _reload_if_changed(self):
+        """Pick up edits to the rules file, checking its mtime at most every few seconds"""
+        if not self.rules_path or time.monotonic() - self._checked_at < self.RELOAD_CHECK_SECONDS:
+            return
+        
+        self._checked_at = time.monotonic()
+        try:
+            if os.path.getmtime(self.rules_path) != self._mtime:
+                self.reload()
+        except OSError:
+            pass
+    
+    def route(
+        self,
+        task: str,
+        user_message: str,
+        intent: Optional[str] = None,
+        rule_parsed: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Pick the route for an LLM call
+        
+        Args:
+            task: Kind of call ("classify", "batch_classify", "extract", "fused")
+            user_message: User's message/text command
+            intent: Intent value, if already known
+            rule_parsed: Whether the local rules/parser already recovered part of the answer
+        
+        Returns:
+            Route dictionary with name, model and max_tokens
+        """
+        self._reload_if_changed()
+        length = len(user_message)
+        family = INTENT_FAMILIES.get(intent or "unknown", "unknown")
+        
+        for route in self.routes:
+            if "task" in route and route["task"] != task:
+                continue
+            if "intent" in route and intent not in self._as_list(route["intent"]):
+                continue
+            if "family" in route and family not in self._as_list(route["family"]):
+                continue
+            if "min_length" in route and length < route["min_length"]:
+                continue
+            if "max_length" in route and length > route["max_length"]:
+                continue
+            if "rule_parsed" in route and route["rule_parsed"] != rule_parsed:
+                continue
+            return route
+        
+        return self.fallback
+    
+    async def chat(self, llm: LLMClient, route: Dict[str, Any], **kwargs) -> Any:
+        """
+        Run a chat completion on a route's model and token budget, recording its metrics
+        
+        Args:
+            llm: LLM client to call
+            route: Route returned by route()
+            **kwargs: Remaining arguments for chat.completions.create
+        
+        Returns:
+            Chat completion response
+        """
+        kwargs.setdefault("max_tokens", route.get("max_tokens") or self.fallback["max_tokens"])
+        metrics = self.metrics[route["name"]]
+        metrics["calls"] += 1
+        start = time.monotonic()
+        
+        try:
+            response = await llm.chat(model=route["model"], **kwargs)
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        
+        self._latencies[route["name"]].append(time.monotonic() - start)
+        record_usage(response)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            metrics["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        return response
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-route latency and token statistics
+        
+        Returns:
+            Dictionary keyed by route name with calls, errors, token totals and latency percentiles
+        """
+        stats = {}
+        for name, metrics in self.metrics.items():
+            latencies = sorted(self._latencies[name])
+            successes = metrics["calls"] - metrics["errors"]
+            stats[name] = {
+                **metrics,
+                "avg_prompt_tokens": metrics["prompt_tokens"] / successes if successes else 0.0,
+                "avg_completion_tokens": metrics["completion_tokens"] / successes if successes else 0.0,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+                "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+            }
+        return {"rules_path": self.rules_path, "routes": [route["name"] for route in self.routes], "metrics": stats}
+    
+    @staticmethod
+    def _as_list(value: Any) -> List[Any]:
+        """Accept either a single value or a list in a route condition"""
+        return value if isinstance(value, list) else [value]
+
+
+# Process-wide router shared by the classifier and extractor
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """
+    Get the shared model router
+    
+    Returns:
+        ModelRouter instance
+    """
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
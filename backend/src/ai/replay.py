@@ -0,0 +1,289 @@
+"""
+Replay Benchmark - Record real LLM traffic once, then benchmark the AI pipeline offline
+
+Record (calls OpenAI once per distinct prompt, for every pipeline variant):
+    python -m src.ai.replay record messages.txt fixture.json.gz
+
+Replay against a local fake LLM that answers from the fixture with the
+recorded latencies:
+    python -m src.ai.replay bench fixture.json.gz --concurrency 32 --repeat 5
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from src.ai.agent import AIAgent
+from src.ai.entity_extractor import EntityExtractor
+from src.ai.intent_classifier import IntentClassifier
+from src.ai.llm_client import get_llm_client
+from src.ai.model_router import ModelRouter
+from src.services.cache_service import CacheService
+
+
+# Pipeline variants: AIAgent / IntentClassifier options to compare
+VARIANTS: Dict[str, Dict[str, bool]] = {
+    "fused": {"fused_parsing": True},
+    "two_call": {"fused_parsing": False},
+    "speculative": {"fused_parsing": False, "speculative_extraction": True},
+    "batched": {"fused_parsing": False, "batch_classification": True},
+}
+
+
+def call_key(kwargs: Dict[str, Any]) -> str:
+    """Fixture lookup key for a completion request (its messages)"""
+    return hashlib.sha1(json.dumps(kwargs.get("messages"), sort_keys=True).encode()).hexdigest()
+
+
+def build_agent(variant: str, api_key: Optional[str] = None) -> AIAgent:
+    """
+    Build an agent for a pipeline variant with fresh caches and routing metrics
+    
+    Args:
+        variant: Name in VARIANTS
+        api_key: OpenAI API key (a distinct fake key per variant when replaying)
+    
+    Returns:
+        AIAgent instance
+    """
+    options = VARIANTS[variant]
+    cache = CacheService()
+    router = ModelRouter()
+    intent_classifier = IntentClassifier(
+        openai_api_key=api_key,
+        cache=cache,
+        batch_classification=options.get("batch_classification", False),
+        router=router
+    )
+    entity_extractor = EntityExtractor(openai_api_key=api_key, cache=cache, router=router)
+    return AIAgent(
+        intent_classifier=intent_classifier,
+        entity_extractor=entity_extractor,
+        fused_parsing=options.get("fused_parsing", True),
+        speculative_extraction=options.get("speculative_extraction", False)
+    )
+
+
+class Recorder:
+    """Wraps a live completions endpoint and records each request/response pair with its latency"""
+    
+    def __init__(self, create: Callable):
+        """
+        Initialize recorder
+        
+        Args:
+            create: The real chat.completions.create coroutine function
+        """
+        self._create = create
+        self.calls: Dict[str, Dict[str, Any]] = {}
+    
+    async def create(self, **kwargs) -> Any:
+        """Forward a completion request and record it"""
+        start = time.monotonic()
+        response = await self._create(**kwargs)
+        usage = getattr(response, "usage", None)
+        
+        self.calls[call_key(kwargs)] = {
+            "messages": kwargs.get("messages"),
+            "content": response.choices[0].message.content,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "latency": time.monotonic() - start
+        }
+        return response
+
+
+class FakeCompletions:
+    """Answers completion requests from a fixture, sleeping for a recorded latency"""
+    
+    def __init__(self, calls: List[Dict[str, Any]], latency_scale: float = 1.0, seed: int = 0):
+        """
+        Initialize fake completions endpoint
+        
+        Args:
+            calls: Recorded calls from the fixture
+            latency_scale: Multiplier applied to recorded latencies
+            seed: Random seed for latency sampling
+        """
+        self.calls = {call_key(call): call for call in calls}
+        self.latencies = [call["latency"] for call in calls] or [0.0]
+        self.latency_scale = latency_scale
+        self._random = random.Random(seed)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    
+    async def create(self, **kwargs) -> Any:
+        """Return the recorded response (or an "unknown" answer for an unrecorded prompt)"""
+        call = self.calls.get(call_key(kwargs))
+        if call is None:
+            # Unrecorded prompt: latency from the overall distribution, neutral answer
+            self.stats["misses"] += 1
+            latency = self._random.choice(self.latencies)
+            json_mode = kwargs.get("response_format", {}).get("type") == "json_object"
+            call = {"content": "{}" if json_mode else "unknown", "prompt_tokens": 0, "completion_tokens": 0}
+        else:
+            self.stats["hits"] += 1
+            latency = call["latency"]
+        
+        await asyncio.sleep(latency * self.latency_scale)
+        self.stats["prompt_tokens"] += call["prompt_tokens"]
+        self.stats["completion_tokens"] += call["completion_tokens"]
+        
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=call["content"]))],
+            usage=SimpleNamespace(
+                prompt_tokens=call["prompt_tokens"],
+                completion_tokens=call["completion_tokens"]
+            )
+        )
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def run_messages(agent: AIAgent, messages: List[str], concurrency: int) -> Dict[str, Any]:
+    """
+    Run messages through an agent with bounded concurrency
+    
+    Args:
+        agent: AI agent
+        messages: User messages
+        concurrency: Messages in flight at once
+    
+    Returns:
+        Dictionary with sorted per-message latencies and wall-clock duration
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    
+    async def one(message: str):
+        async with semaphore:
+            start = time.monotonic()
+            await agent.process_message(message)
+            latencies.append(time.monotonic() - start)
+    
+    start = time.monotonic()
+    await asyncio.gather(*(one(message) for message in messages))
+    return {"latencies": sorted(latencies), "wall": time.monotonic() - start}
+
+
+async def record(messages: List[str], fixture_path: str, variants: List[str]):
+    """
+    Run messages through each variant against the real API and save the traffic
+    
+    Args:
+        messages: User messages
+        fixture_path: Output fixture (gzip-compressed JSON)
+        variants: Variant names to record
+    """
+    llm = get_llm_client()
+    recorder = Recorder(llm.client.chat.completions.create)
+    llm.client.chat.completions.create = recorder.create
+    
+    for variant in variants:
+        print(f"Recording {variant}...")
+        await run_messages(build_agent(variant), messages, concurrency=4)
+    
+    with gzip.open(fixture_path, "wt") as f:
+        json.dump({"messages": messages, "calls": list(recorder.calls.values())}, f)
+    print(f"Saved {len(recorder.calls)} calls for {len(messages)} messages to {fixture_path}")
+    await llm.close()
+
+
+async def bench(
+    fixture_path: str,
+    variants: List[str],
+    concurrency: int,
+    repeat: int,
+    latency_scale: float
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Replay a fixture through each variant and report latency, throughput and tokens
+    
+    Args:
+        fixture_path: Fixture written by record()
+        variants: Variant names to benchmark
+        concurrency: Messages in flight at once
+        repeat: Times the message list is replayed (exercises caches and coalescing)
+        latency_scale: Multiplier applied to recorded latencies
+    
+    Returns:
+        Report keyed by variant name
+    """
+    with gzip.open(fixture_path, "rt") as f:
+        fixture = json.load(f)
+    messages = fixture["messages"] * repeat
+    
+    report = {}
+    for variant in variants:
+        agent = build_agent(variant, api_key=f"replay-{variant}")
+        fake = FakeCompletions(fixture["calls"], latency_scale)
+        agent.intent_classifier.llm.client.chat.completions.create = fake.create
+        
+        result = await run_messages(agent, messages, concurrency)
+        latencies = result["latencies"]
+        report[variant] = {
+            "messages": len(messages),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "throughput_per_s": len(messages) / result["wall"] if result["wall"] else 0.0,
+            "llm_calls_per_message": (fake.stats["hits"] + fake.stats["misses"]) / len(messages),
+            "tokens_per_message": (fake.stats["prompt_tokens"] + fake.stats["completion_tokens"]) / len(messages),
+            "unrecorded_calls": fake.stats["misses"]
+        }
+        await agent.intent_classifier.llm.close()
+    
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Record/replay benchmark for the AI pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    record_parser = commands.add_parser("record", help="record live LLM traffic to a fixture")
+    record_parser.add_argument("messages", help="text file with one user message per line")
+    record_parser.add_argument("fixture", help="output fixture (.json.gz)")
+    record_parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    
+    bench_parser = commands.add_parser("bench", help="replay a fixture against a fake LLM")
+    bench_parser.add_argument("fixture", help="fixture written by record")
+    bench_parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    bench_parser.add_argument("--concurrency", type=int, default=16)
+    bench_parser.add_argument("--repeat", type=int, default=1)
+    bench_parser.add_argument("--latency-scale", type=float, default=1.0)
+    bench_parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "record":
+        with open(args.messages) as f:
+            messages = [line.strip() for line in f if line.strip()]
+        asyncio.run(record(messages, args.fixture, args.variants))
+        return 0
+    
+    report = asyncio.run(bench(args.fixture, args.variants, args.concurrency, args.repeat, args.latency_scale))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    
+    print(f"{'variant':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'msg/s':>9} {'calls/msg':>10} {'tok/msg':>8}")
+    for variant, row in report.items():
+        print(
+            f"{variant:<12} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+            f"{row['throughput_per_s']:>9.1f} {row['llm_calls_per_message']:>10.2f} {row['tokens_per_message']:>8.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Rule Classifier - Deterministic pattern-based intent classification for common commands
+"""
+import re
+from typing import List, Optional, Pattern, Tuple
+
+
+AMOUNT = r"\$?\d[\d,]*(?:\.\d+)?\s*(?:usdc|usd|dollars?|bucks)?"
+FREQUENCY = (
+    r"(?:daily|weekly|monthly|yearly|annually"
+    r"|(?:\b(?:per|a|an|each|every)\s+|/\s*)(?:day|week|month|year)\b)"
+)
+
+
+class RuleBasedClassifier:
+    """Classifies unambiguous commands locally without calling the LLM"""
+    
+    # (intent value, compiled pattern) - a message must match exactly one intent
+    RULES: List[Tuple[str, Pattern]] = [
+        ("help", re.compile(
+            r"^(?:help|\?|commands|what can you do|how does this work|what can i do)\W*$"
+        )),
+        ("balance_query", re.compile(
+            r"^(?:check|show|get|view|what'?s|what is)?\s*(?:me\s+)?(?:my\s+)?(?:usdc\s+)?(?:wallet\s+)?balance\W*$"
+            r"|^how much (?:usdc|money|funds?) do i have\W*$"
+        )),
+        ("history", re.compile(
+            r"^(?:show|view|list|see|get)\s+(?:me\s+)?(?:my\s+)?(?:recent\s+|past\s+|last\s+)?"
+            r"(?:transactions?|transaction history|history|payments)\W*$"
+            r"|^(?:transaction\s+|payment\s+)?history\W*$"
+        )),
+        ("subscription", re.compile(
+            rf"^(?:pay|send|subscribe)\b.*{AMOUNT}.*{FREQUENCY}"
+            r"|^(?:set up|create|start)\s+(?:a\s+)?(?:recurring payment|subscription)\b"
+        )),
+        ("cancel_subscription", re.compile(
+            r"^(?:cancel|stop|end)\s+(?:my\s+|the\s+)?(?:[\w-]+\s+)?(?:subscription|recurring payment)\b"
+        )),
+        ("split_payment", re.compile(
+            rf"^split\s+(?:the\s+)?(?:bill\s+(?:of\s+)?)?{AMOUNT}\s+(?:\d+\s+ways|between|among|with)\b"
+        )),
+        ("release_escrow", re.compile(
+            r"^release\s+(?:the\s+|my\s+)?(?:escrow|escrowed)\b"
+        )),
+        ("create_escrow", re.compile(
+            rf"^(?:create\s+(?:an?\s+)?escrow\s+(?:for\s+|of\s+)?|escrow\s+){AMOUNT}"
+        )),
+        # One recipient token, optionally followed by a "for <memo>" tail and nothing else
+        ("simple_payment", re.compile(
+            rf"^(?:send|pay|transfer)\s+{AMOUNT}\s+(?:to|for)\s+@?[\w.+@-]+(?:\s+for\s+\S.*)?[.!]?$"
+        )),
+    ]
+    
+    # Extra recipients, conditions, corrections or negations: a plain payment rule must not
+    # fire on "send $50 to alice and bob", "... if she finishes the job", "..., not bob"
+    CLAUSE_PATTERN = re.compile(
+        r"\b(?:and|or|but|if|unless|when|once|after|not|never|instead|except|rather)\b|n't\b|,(?!\d)|[;?]"
+    )
+    
+    # Messages with more than one amount may carry several actions
+    AMOUNT_PATTERN = re.compile(
+        r"\$\s?\d[\d,]*(?:\.\d+)?(?:\s*(?:usdc|usd|dollars?)\b)?"
+        r"|\b\d[\d,]*(?:\.\d+)?\s*(?:usdc|usd|dollars?)\b"
+    )
+    
+    # Degraded-mode keyword fallback, checked in order (most specific first); money-moving
+    # matches are mapped to "unknown" by IntentClassifier.classify_degraded
+    KEYWORDS: List[Tuple[str, Pattern]] = [
+        ("cancel_subscription", re.compile(r"\b(?:cancel|stop|end)\b.*\b(?:subscription|recurring)\b")),
+        ("release_escrow", re.compile(r"\brelease\b")),
+        ("create_escrow", re.compile(r"\bescrow\b")),
+        ("split_payment", re.compile(r"\b(?:split|divide)\b")),
+        ("subscription", re.compile(rf"\b(?:subscri\w*|recurring)\b|{FREQUENCY}")),
+        ("defi_invest", re.compile(r"\b(?:invest|stake|yield|aave|vault)\b")),
+        ("balance_query", re.compile(r"\bbalance\b|\bhow much\b.*\bhave\b")),
+        ("history", re.compile(r"\b(?:history|transactions)\b")),
+        ("simple_payment", re.compile(r"\b(?:send|pay|transfer|give)\b")),
+        ("help", re.compile(r"\bhelp\b|\bwhat can you do\b")),
+    ]
+    
+    # Negated requests are never guessed from keywords
+    NEGATION_PATTERN = re.compile(r"\b(?:not|never|don'?t)\b|n't\b")
+    
+    def classify(self, user_message: str) -> Optional[str]:
+        """
+        Classify a message with the rule set
+        
+        Args:
+            user_message: User's message/text command
+        
+        Returns:
+            Intent value, or None if no rule or more than one rule matched
+        """
+        text = " ".join(user_message.lower().split())
+        if not text or len(self.AMOUNT_PATTERN.findall(text)) > 1:
+            return None
+        
+        matches = {intent for intent, pattern in self.RULES if pattern.search(text)}
+        
+        # Subscription phrasing also reads as a plain "pay $X to Y"
+        if "subscription" in matches or self.CLAUSE_PATTERN.search(text):
+            matches.discard("simple_payment")
+        
+        if len(matches) != 1:
+            return None
+        return matches.pop()
+    
+    def classify_lenient(self, user_message: str) -> str:
+        """
+        Best-effort keyword classification, used when the LLM is unavailable
+        
+        Args:
+            user_message: User's message/text command
+        
+        Returns:
+            Intent value ("unknown" if no keyword matched)
+        """
+        strict = self.classify(user_message)
+        if strict:
+            return strict
+        
+        text = " ".join(user_message.lower().split())
+        if self.NEGATION_PATTERN.search(text):
+            return "unknown"
+        for intent, pattern in self.KEYWORDS:
+            if pattern.search(text):
+                return intent
+        return "unknown"
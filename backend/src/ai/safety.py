@@ -1,7 +1,7 @@
 """
 Safety Checker - Validates transactions and enforces limits
 """
-from typing import Tuple
+from typing import List, Tuple
 
 
 class SafetyChecker:
@@ -42,6 +42,35 @@ class SafetyChecker:
         
         return True, "OK"
     
+    def check_batch_limits(
+        self,
+        amounts: List[float],
+        user_address: str
+    ) -> Tuple[bool, str]:
+        """
+        Check a batch of payments sent together against the limits
+        
+        Each payment must be within the single transaction limit and their
+        total within the remaining daily limit.
+        
+        Args:
+            amounts: Payment amounts in USD
+            user_address: User's wallet address
+            
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if any(amount <= 0 for amount in amounts):
+            return False, "Every payment amount must be positive"
+        
+        if max(amounts) > self.MAX_SINGLE_TRANSACTION:
+            return False, f"Amount exceeds single transaction limit (${self.MAX_SINGLE_TRANSACTION})"
+        
+        if self.get_daily_total(user_address) + sum(amounts) > self.MAX_DAILY_AMOUNT:
+            return False, f"Batch total would exceed daily limit (${self.MAX_DAILY_AMOUNT})"
+        
+        return True, "OK"
+    
     def validate_address(self, address: str) -> bool:
         """
         Validate Ethereum address format
@@ -0,0 +1,79 @@
+"""
+Token Counter - Counts prompt tokens with tiktoken, falling back to a character estimate
+"""
+import sys
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional: counts become estimates
+    tiktoken = None
+
+
+CHARS_PER_TOKEN = 4  # rough average for English text when tiktoken is unavailable
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Optional[Any]:
+    """Get (and cache) the tiktoken encoding for a model"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Older tiktoken releases don't know newer model names
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; estimate when offline
+        print(f"Error loading tokenizer for {model}: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count the tokens in a piece of text
+    
+    Args:
+        text: Text to count
+        model: Model whose tokenizer to use
+    
+    Returns:
+        Token count (an estimate when tiktoken is not installed)
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, -(-len(text) // CHARS_PER_TOKEN)) if text else 0
+    return len(encoding.encode(text))
+
+
+def check_prompt_sizes(prompts: Dict[str, str], budget: int) -> List[str]:
+    """
+    Check registered prompts against a token budget
+    
+    Args:
+        prompts: Mapping of prompt name to prompt text
+        budget: Maximum tokens allowed per prompt
+    
+    Returns:
+        One message per prompt over budget (empty when all fit)
+    """
+    violations = []
+    for name, prompt in prompts.items():
+        tokens = count_tokens(prompt)
+        if tokens > budget:
+            violations.append(f"{name}: {tokens} tokens (budget {budget})")
+    return violations
+
+
+if __name__ == "__main__":
+    # Prompt-size regression check: python -m src.ai.token_counter
+    from src.ai.prompts import EXTRACT_PROMPTS, EXTRACT_PROMPT_TOKEN_BUDGET
+    
+    for name, prompt in EXTRACT_PROMPTS.items():
+        print(f"{name}: {count_tokens(prompt)} tokens")
+    problems = check_prompt_sizes(EXTRACT_PROMPTS, EXTRACT_PROMPT_TOKEN_BUDGET)
+    for problem in problems:
+        print(f"❌ {problem}")
+    sys.exit(1 if problems else 0)
@@ -1,28 +1,46 @@
 """
 API Dependencies - Dependency injection for routes
 """
+import hmac
 import os
 from typing import Optional
+from fastapi import Header, HTTPException
 from src.ai.agent import AIAgent
 from src.ai.intent_classifier import IntentClassifier
 from src.ai.entity_extractor import EntityExtractor
 from src.ai.safety import SafetyChecker
-from src.blockchain.arc_client import ArcClient
+from src.blockchain.arc_client import AsyncArcClient
 from src.blockchain.contract_caller import ContractCaller
+from src.services.cache_service import CacheService
+from src.services.quote_service import QuoteService
 
 
 # Global instances (would be better with proper DI container)
 _ai_agent: Optional[AIAgent] = None
 _contract_caller: Optional[ContractCaller] = None
-_arc_client: Optional[ArcClient] = None
+_arc_client: Optional[AsyncArcClient] = None
+_ai_cache: Optional[CacheService] = None
+_quote_service: Optional[QuoteService] = None
+
+
+def get_ai_cache() -> CacheService:
+    """Get the response cache shared by the AI components"""
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = CacheService(
+            max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000")),
+            default_ttl=int(os.getenv("AI_CACHE_TTL", "300"))
+        )
+    return _ai_cache
 
 
 def get_ai_agent() -> AIAgent:
     """Get AI agent instance"""
     global _ai_agent
     if _ai_agent is None:
-        intent_classifier = IntentClassifier()
-        entity_extractor = EntityExtractor()
+        ai_cache = get_ai_cache()
+        intent_classifier = IntentClassifier(cache=ai_cache)
+        entity_extractor = EntityExtractor(cache=ai_cache)
         safety_checker = SafetyChecker()
         _ai_agent = AIAgent(
             intent_classifier=intent_classifier,
@@ -32,16 +50,22 @@ def get_ai_agent() -> AIAgent:
     return _ai_agent
 
 
-def get_arc_client() -> ArcClient:
+def get_arc_client() -> AsyncArcClient:
     """Get Arc blockchain client"""
     global _arc_client
     if _arc_client is None:
         rpc_url = os.getenv("ARC_RPC_URL", "https://rpc-test-1.archiechain.io")
         private_key = os.getenv("PRIVATE_KEY")
-        _arc_client = ArcClient(rpc_url=rpc_url, private_key=private_key)
+        _arc_client = AsyncArcClient(rpc_url=rpc_url, private_key=private_key)
     return _arc_client
 
 
+async def close_arc_client():
+    """Close the Arc client's connection pool"""
+    if _arc_client is not None:
+        await _arc_client.close()
+
+
 def get_contract_caller() -> ContractCaller:
     """Get contract caller instance"""
     global _contract_caller
@@ -64,3 +88,19 @@ def get_contract_caller() -> ContractCaller:
         _contract_caller = ContractCaller(arc_client=arc_client, contracts_config=contracts_config)
     return _contract_caller
 
+
+def get_quote_service() -> QuoteService:
+    """Get the payment quote service"""
+    global _quote_service
+    if _quote_service is None:
+        _quote_service = QuoteService()
+    return _quote_service
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Allow a request only if it carries the AI_ADMIN_TOKEN in the X-Admin-Token header"""
+    expected = os.getenv("AI_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (AI_ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
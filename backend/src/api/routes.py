@@ -3,13 +3,18 @@ API Routes - FastAPI routes for chat, balance, transactions, etc.
 """
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Optional, List
-from src.api.dependencies import get_ai_agent, get_arc_client, get_contract_caller
+from typing import Optional, List, Tuple
+from src.api.dependencies import (
+    get_ai_agent, get_arc_client, get_contract_caller, get_quote_service, require_admin_token
+)
 from src.ai.agent import AIAgent
 from src.ai.intent_classifier import Intent
-from src.blockchain.arc_client import ArcClient
+from src.ai.safety import SafetyChecker
+from src.blockchain.arc_client import AsyncArcClient
 from src.blockchain.contract_caller import ContractCaller
+from src.utils.lane_scheduler import LaneFullError
 from src.blockchain.usdc_handler import USDCHandler
+from src.services.quote_service import QuoteService
 import os
 
 router = APIRouter()
@@ -20,6 +25,7 @@ class ChatMessage(BaseModel):
     """Chat message request model"""
     message: str
     user_address: Optional[str] = None
+    session_id: Optional[str] = None  # lets a follow-up fill in fields a previous message was missing
 
 
 class ChatResponse(BaseModel):
@@ -29,6 +35,13 @@ class ChatResponse(BaseModel):
     transaction_hash: Optional[str] = None
     status: str
     entities: Optional[dict] = None
+    quote: Optional[dict] = None  # set when status is "confirmation_required"
+    metrics: Optional[dict] = None  # per-stage latency and token usage of the AI pipeline
+
+
+class ConfirmRequest(BaseModel):
+    """Quote confirmation request model"""
+    quote_token: str
 
 
 class BalanceResponse(BaseModel):
@@ -52,20 +65,275 @@ class TransactionResponse(BaseModel):
     message: str
 
 
+class IntentExamplesRequest(BaseModel):
+    """Labelled example utterances for the embedding intent index"""
+    intent: str
+    examples: List[str]
+
+
+# Intents that /chat executes (or quotes) directly
+PAYMENT_INTENTS = {"simple_payment", "batch_payment"}
+
+
+async def execute_payment(
+    result: dict,
+    contract_caller: ContractCaller,
+    user_address: Optional[str]
+) -> Optional[str]:
+    """
+    Execute the payment for a chat result that is ready to send
+    
+    Updates the result's transaction_hash and response in place.
+    
+    Args:
+        result: Result from AIAgent.process_message
+        contract_caller: Contract caller instance
+        user_address: User's wallet address
+        
+    Returns:
+        Transaction hash, or None if the result is not an executable payment
+    """
+    if not is_executable_payment(result, user_address):
+        return None
+    
+    tx_hash = await send_payments(contract_caller, result["intent"], result["entities"], user_address)
+    result["transaction_hash"] = tx_hash
+    result["response"] = format_sent(result["intent"], result["entities"], tx_hash)
+    return tx_hash
+
+
+def payment_list(intent: str, entities: dict) -> List[dict]:
+    """The individual payments in a result's entities (a batch's entries, or the single payment)"""
+    if intent == "batch_payment":
+        return entities.get("payments") or []
+    return [entities]
+
+
+def is_executable_payment(result: dict, user_address: Optional[str]) -> bool:
+    """
+    Check whether a chat result is a payment with everything needed to send it
+    
+    Args:
+        result: Result from AIAgent.process_message
+        user_address: User's wallet address
+        
+    Returns:
+        True if the payment can be executed
+    """
+    if result["intent"] not in PAYMENT_INTENTS or result["status"] != "success" or not user_address:
+        return False
+    
+    # Try to resolve recipient address if it's not already an address
+    # In production, resolve email/name to address
+    # For now, assume it's an address or placeholder
+    payments = payment_list(result["intent"], result.get("entities") or {})
+    return bool(payments) and all(p.get("amount") and p.get("recipient") for p in payments)
+
+
+async def send_payments(
+    contract_caller: ContractCaller,
+    intent: str,
+    entities: dict,
+    user_address: str,
+    gas: Optional[dict] = None
+) -> str:
+    """
+    Send a single payment, or a batch as one PaymentRouter.batchPayments transaction
+    
+    Args:
+        contract_caller: Contract caller instance
+        intent: Payment intent value
+        entities: Payment entities
+        user_address: User's wallet address
+        gas: Quoted gas limit and fees ({"gas", "max_fee", "max_priority_fee"} or
+            {"gas", "gas_price"}) to use instead of estimating (optional)
+        
+    Returns:
+        Transaction hash
+    """
+    gas = gas or {}
+    if intent == "batch_payment":
+        payments = entities["payments"]
+        return await contract_caller.batch_payments(
+            recipients=[p["recipient"] for p in payments],
+            amounts=[p["amount"] for p in payments],
+            memos=[p.get("description", "") for p in payments],
+            from_address=user_address,
+            **gas
+        )
+    
+    return await contract_caller.send_payment(
+        recipient=entities["recipient"],
+        amount=entities["amount"],
+        memo=entities.get("description", ""),
+        from_address=user_address,
+        **gas
+    )
+
+
+async def estimate_payments(contract_caller: ContractCaller, intent: str, entities: dict, user_address: str) -> dict:
+    """Estimate gas limit and price for send_payments()"""
+    if intent == "batch_payment":
+        payments = entities["payments"]
+        return await contract_caller.estimate_batch_payments(
+            [p["recipient"] for p in payments],
+            [p["amount"] for p in payments],
+            [p.get("description", "") for p in payments],
+            user_address
+        )
+    return await contract_caller.estimate_payment(
+        entities["recipient"], entities["amount"], entities.get("description", ""), user_address
+    )
+
+
+def check_payment_limits(
+    safety_checker: SafetyChecker,
+    intent: str,
+    entities: dict,
+    user_address: str
+) -> Tuple[bool, str]:
+    """
+    Check a payment against the safety limits
+    
+    A batch goes out in one transaction, so its payments are checked together.
+    
+    Args:
+        safety_checker: Safety checker instance
+        intent: Payment intent value
+        entities: Payment entities
+        user_address: User's wallet address
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if intent == "batch_payment":
+        return safety_checker.check_batch_limits([p["amount"] for p in entities["payments"]], user_address)
+    return safety_checker.check_transaction_limits(entities["amount"], user_address)
+
+
+def format_sent(intent: str, entities: dict, tx_hash: str) -> str:
+    """Format the confirmation text for a sent payment"""
+    if intent == "batch_payment":
+        total = sum(p["amount"] for p in entities["payments"])
+        return f"✅ Sent {len(entities['payments'])} payments totalling ${total:.2f} USDC in one transaction: {tx_hash[:10]}...{tx_hash[-8:]}"
+    
+    amount = entities["amount"]
+    recipient = entities["recipient"]
+    return f"✅ Sent ${amount:.2f} USDC to {recipient[:10]}...{recipient[-8:]}. Transaction: {tx_hash[:10]}...{tx_hash[-8:]}"
+
+
+async def quote_payment(
+    result: dict,
+    contract_caller: ContractCaller,
+    quote_service: QuoteService,
+    safety_checker: SafetyChecker,
+    user_address: Optional[str],
+    always: bool = False
+) -> Optional[dict]:
+    """
+    Hold a payment that needs confirmation and attach a signed quote to the result instead
+    
+    The quote captures the parsed intent, entities, gas estimate and safety
+    verdict, so confirming it needs no AI call and no re-estimation.
+    
+    Args:
+        result: Result from AIAgent.process_message
+        contract_caller: Contract caller instance
+        quote_service: Quote signing service
+        safety_checker: Safety checker instance
+        user_address: User's wallet address
+        always: Quote every executable payment, whatever its amount
+        
+    Returns:
+        The quote, or None if the payment does not need confirmation
+        
+    Raises:
+        ValueError: If the payment is over the safety limits
+    """
+    if not is_executable_payment(result, user_address):
+        return None
+    
+    intent = result["intent"]
+    entities = result["entities"]
+    payments = payment_list(intent, entities)
+    total = sum(p["amount"] for p in payments)
+    requires_confirmation = safety_checker.require_confirmation(total)
+    if not (always or requires_confirmation or os.getenv("PAYMENT_CONFIRMATION", "auto") == "always"):
+        return None
+    
+    within_limits, reason = check_payment_limits(safety_checker, intent, entities, user_address)
+    if not within_limits:
+        raise ValueError(reason)
+    
+    gas = await estimate_payments(contract_caller, intent, entities, user_address)
+    signed = quote_service.issue({
+        "intent": intent,
+        "entities": entities,
+        "user_address": user_address,
+        "gas": gas,
+        "safety": {
+            "within_limits": within_limits,
+            "reason": reason,
+            "requires_confirmation": requires_confirmation
+        }
+    })
+    
+    quote = {**signed, **gas}
+    result["quote"] = quote
+    result["status"] = "confirmation_required"
+    if len(payments) > 1:
+        summary = f"{len(payments)} payments totalling ${total:.2f}"
+    else:
+        summary = f"${total:.2f} to {entities['recipient']}"
+    result["response"] = f"Confirm sending {summary}? This quote expires in {quote_service.ttl}s."
+    return quote
+
+
+async def settle_payment(
+    result: dict,
+    contract_caller: ContractCaller,
+    quote_service: QuoteService,
+    safety_checker: SafetyChecker,
+    user_address: Optional[str]
+) -> Optional[str]:
+    """
+    Quote a payment that needs confirmation, otherwise execute it (used by /chat)
+    
+    Args:
+        result: Result from AIAgent.process_message (updated in place)
+        contract_caller: Contract caller instance
+        quote_service: Quote signing service
+        safety_checker: Safety checker instance
+        user_address: User's wallet address
+        
+    Returns:
+        Transaction hash, or None if nothing was sent (quoted or not an executable payment)
+    """
+    quote = await quote_payment(result, contract_caller, quote_service, safety_checker, user_address)
+    if quote is not None:
+        return None
+    return await execute_payment(result, contract_caller, user_address)
+
+
 # Routes
 @router.post("/chat", response_model=ChatResponse)
 async def process_message(
     msg: ChatMessage,
     ai_agent: AIAgent = Depends(get_ai_agent),
-    contract_caller: ContractCaller = Depends(get_contract_caller)
+    contract_caller: ContractCaller = Depends(get_contract_caller),
+    quote_service: QuoteService = Depends(get_quote_service)
 ):
     """
     Process user message with AI agent and execute transactions
     
+    Payments that need confirmation are not executed; the response carries a
+    signed quote to pass to /chat/confirm instead.
+    
     Args:
         msg: Chat message request
         ai_agent: AI agent instance
         contract_caller: Contract caller instance
+        quote_service: Quote signing service
         
     Returns:
         Chat response with intent and result
@@ -74,52 +342,175 @@ async def process_message(
         # Process message with AI agent
         result = await ai_agent.process_message(
             user_message=msg.message,
-            user_address=msg.user_address
+            user_address=msg.user_address,
+            session_id=msg.session_id
         )
         
-        # If intent is simple_payment and we have entities, execute transaction
-        if result["intent"] == "simple_payment" and result["status"] == "success":
-            entities = result.get("entities", {})
-            amount = entities.get("amount")
-            recipient = entities.get("recipient")
-            
-            # Try to resolve recipient address if it's not already an address
-            if recipient and not recipient.startswith("0x"):
-                # In production, resolve email/name to address
-                # For now, assume it's an address or placeholder
-                pass
-            
-            # Execute transaction if we have all required info
-            if amount and recipient and msg.user_address:
-                try:
-                    tx_hash = await contract_caller.send_payment(
-                        recipient=recipient,
-                        amount=amount,
-                        memo=entities.get("description", ""),
-                        from_address=msg.user_address
-                    )
-                    result["transaction_hash"] = tx_hash
-                    result["response"] = f"✅ Sent ${amount:.2f} USDC to {recipient[:10]}...{recipient[-8:]}. Transaction: {tx_hash[:10]}...{tx_hash[-8:]}"
-                except Exception as e:
-                    result["status"] = "error"
-                    result["response"] = f"❌ Transaction failed: {str(e)}"
+        # If intent is simple_payment and we have entities, quote or execute transaction
+        try:
+            await settle_payment(
+                result, contract_caller, quote_service, ai_agent.safety_checker, msg.user_address
+            )
+        except Exception as e:
+            result["status"] = "error"
+            result["response"] = f"❌ Transaction failed: {str(e)}"
         
         return ChatResponse(
             intent=result["intent"],
             response=result["response"],
             transaction_hash=result.get("transaction_hash"),
             status=result["status"],
-            entities=result.get("entities")
+            entities=result.get("entities"),
+            quote=result.get("quote"),
+            metrics=result.get("metrics")
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/confirm", response_model=ChatResponse)
+async def confirm_payment(
+    req: ConfirmRequest,
+    ai_agent: AIAgent = Depends(get_ai_agent),
+    contract_caller: ContractCaller = Depends(get_contract_caller),
+    quote_service: QuoteService = Depends(get_quote_service)
+):
+    """
+    Execute a quoted payment (no AI calls, no gas re-estimation)
+    
+    The safety limits are checked again, since the user's daily total may
+    have changed since the quote was issued.
+    
+    Args:
+        req: Quote token from /chat
+        ai_agent: AI agent instance (for its safety checker)
+        contract_caller: Contract caller instance
+        quote_service: Quote signing service
+        
+    Returns:
+        Chat response with the transaction hash
+    """
+    try:
+        quote = await quote_service.redeem(req.quote_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    entities = quote["entities"]
+    within_limits, reason = check_payment_limits(
+        ai_agent.safety_checker, quote["intent"], entities, quote["user_address"]
+    )
+    if not (quote["safety"]["within_limits"] and within_limits):
+        # Nothing was sent, so the quote stays usable once the limits allow it
+        await quote_service.release(quote)
+        raise HTTPException(status_code=400, detail=reason)
+    
+    try:
+        tx_hash = await send_payments(
+            contract_caller, quote["intent"], entities, quote["user_address"], gas=quote["gas"]
+        )
+    except Exception as e:
+        # Queue full, or rejected by validation or the node: nothing was broadcast, so the
+        # quote can be retried. Anything else (e.g. a timeout) may have sent it and stays spent.
+        if isinstance(e, (LaneFullError, ValueError)):
+            await quote_service.release(quote)
+        return ChatResponse(
+            intent=quote["intent"],
+            response=f"❌ Transaction failed: {str(e)}",
+            status="error",
+            entities=entities
+        )
+    
+    return ChatResponse(
+        intent=quote["intent"],
+        response=format_sent(quote["intent"], entities, tx_hash),
+        transaction_hash=tx_hash,
+        status="success",
+        entities=entities
+    )
+
+
+@router.get("/stats/ai")
+async def get_ai_stats(ai_agent: AIAgent = Depends(get_ai_agent)):
+    """
+    Get AI pipeline statistics (classification path hit rates, etc.)
+    
+    Args:
+        ai_agent: AI agent instance
+        
+    Returns:
+        AI pipeline statistics
+    """
+    return ai_agent.get_stats()
+
+
+@router.get("/stats/chain")
+async def get_chain_stats(contract_caller: ContractCaller = Depends(get_contract_caller)):
+    """
+    Get transaction submission statistics (per-sender queue depth and wait time, nonces)
+    
+    Args:
+        contract_caller: Contract caller instance
+        
+    Returns:
+        Transaction submission statistics
+    """
+    return contract_caller.get_stats()
+
+
+@router.post("/ai/examples", dependencies=[Depends(require_admin_token)])
+async def add_intent_examples(
+    req: IntentExamplesRequest,
+    ai_agent: AIAgent = Depends(get_ai_agent)
+):
+    """
+    Add labelled examples to the embedding intent index (no redeploy needed)
+    
+    Requires the X-Admin-Token header.
+    
+    Args:
+        req: Intent and example utterances
+        ai_agent: AI agent instance
+        
+    Returns:
+        Total number of examples in the index
+    """
+    embedding_classifier = ai_agent.intent_classifier.embedding_classifier
+    if embedding_classifier is None:
+        raise HTTPException(status_code=400, detail="Embedding intent backend is not enabled")
+    
+    try:
+        intent = Intent(req.intent)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown intent: {req.intent}")
+    
+    try:
+        total = await embedding_classifier.add_examples(intent.value, req.examples)
+        return {"intent": intent.value, "added": len(req.examples), "total_examples": total}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ai/routing/reload", dependencies=[Depends(require_admin_token)])
+async def reload_routing_rules(ai_agent: AIAgent = Depends(get_ai_agent)):
+    """
+    Reload model routing rules from AI_ROUTING_RULES without a restart
+    
+    Args:
+        ai_agent: AI agent instance
+        
+    Returns:
+        Active route names
+    """
+    model_router = ai_agent.intent_classifier.router
+    model_router.reload()
+    return {"rules_path": model_router.rules_path, "routes": [route["name"] for route in model_router.routes]}
+
+
 @router.get("/balance/{address}", response_model=BalanceResponse)
 async def get_balance(
     address: str,
-    arc_client: ArcClient = Depends(get_arc_client)
+    arc_client: AsyncArcClient = Depends(get_arc_client)
 ):
     """
     Get USDC balance for an address
@@ -137,7 +528,7 @@ async def get_balance(
             raise HTTPException(status_code=500, detail="USDC contract address not configured")
         
         usdc_handler = USDCHandler(arc_client, usdc_address)
-        balance = usdc_handler.get_balance(address)
+        balance = await usdc_handler.get_balance(address)
         
         return BalanceResponse(
             balance=balance,
@@ -183,6 +574,12 @@ async def send_transaction(
             message=f"Transaction submitted: {tx_hash}"
         )
         
+    except HTTPException:
+        raise
+    except LaneFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -218,7 +615,7 @@ async def get_transactions(
 @router.get("/transaction/{tx_hash}")
 async def get_transaction(
     tx_hash: str,
-    arc_client: ArcClient = Depends(get_arc_client)
+    arc_client: AsyncArcClient = Depends(get_arc_client)
 ):
     """
     Get transaction details by hash
@@ -231,7 +628,7 @@ async def get_transaction(
         Transaction details
     """
     try:
-        receipt = arc_client.get_transaction_receipt(tx_hash)
+        receipt = await arc_client.get_transaction_receipt(tx_hash)
         return {
             "transaction_hash": tx_hash,
             "receipt": receipt,
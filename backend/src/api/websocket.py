@@ -2,8 +2,10 @@
 WebSocket Handler - Real-time chat via WebSocket
 """
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set
-from src.api.dependencies import get_ai_agent
+from typing import Any, Dict, Optional, Set, Tuple
+import json
+from src.api.dependencies import get_ai_agent, get_contract_caller, get_quote_service
+from src.api.routes import quote_payment
 from src.ai.agent import AIAgent
 
 
@@ -39,13 +41,49 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
+def parse_client_message(data: str, stream: bool) -> Tuple[str, Optional[str], bool]:
+    """
+    Parse an incoming WebSocket frame
+    
+    Frames are either plain text or JSON like
+    {"message": "...", "user_address": "0x...", "stream": true}.
+    
+    Args:
+        data: Raw frame text
+        stream: Connection-level streaming default
+        
+    Returns:
+        Tuple of (message, user_address, stream)
+    """
+    try:
+        payload: Any = json.loads(data)
+    except json.JSONDecodeError:
+        payload = None
+    
+    if not isinstance(payload, dict) or "message" not in payload:
+        return data, None, stream
+    
+    return (
+        str(payload["message"]),
+        payload.get("user_address"),
+        bool(payload.get("stream", stream))
+    )
+
+
+async def websocket_endpoint(websocket: WebSocket, client_id: str, stream: bool = False):
     """
     WebSocket endpoint for real-time chat
     
+    Payments are never executed here: every ready payment is returned as a
+    signed quote, which is executed through POST /api/chat/confirm. In
+    streaming mode (?stream=true or "stream": true in a JSON frame) each
+    message produces staged events - intent, entities, response, done -
+    instead of one final frame.
+    
     Args:
         websocket: WebSocket connection
         client_id: Client identifier
+        stream: Stream staged events by default for this connection
     """
     await manager.connect(websocket, client_id)
     ai_agent = get_ai_agent()
@@ -53,19 +91,49 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     try:
         while True:
             data = await websocket.receive_text()
+            message, user_address, stream_message = parse_client_message(data, stream)
+            
+            async def settle(result: Dict[str, Any]) -> Optional[str]:
+                await quote_payment(
+                    result, get_contract_caller(), get_quote_service(), ai_agent.safety_checker, user_address,
+                    always=True
+                )
+                return None
+            
+            if stream_message:
+                async for event in ai_agent.process_message_stream(
+                    user_message=message,
+                    user_address=user_address,
+                    execute=settle,
+                    session_id=client_id
+                ):
+                    await websocket.send_json(event)
+                continue
             
             # Process message with AI agent
-            result = await ai_agent.process_message(user_message=data)
+            # The connection is the conversation: follow-ups can fill in missing fields
+            result = await ai_agent.process_message(
+                user_message=message,
+                user_address=user_address,
+                session_id=client_id
+            )
+            
+            try:
+                await settle(result)
+            except Exception as e:
+                result["status"] = "error"
+                result["response"] = f"❌ Transaction failed: {str(e)}"
             
             # Send response back
             response = {
                 "intent": result["intent"],
                 "response": result["response"],
-                "status": result["status"]
+                "status": result["status"],
+                "transaction_hash": result.get("transaction_hash"),
+                "quote": result.get("quote")
             }
             
             await websocket.send_json(response)
             
     except WebSocketDisconnect:
         manager.disconnect(client_id)
-
@@ -1,10 +1,29 @@
 """
 Arc Blockchain Client - Connects to Arc testnet RPC
+
+ArcClient is blocking; AsyncArcClient is the variant for async code (API
+routes), sharing one pooled HTTP session with per-call timeouts.
 """
-from typing import Dict, Any, Optional
-from web3 import Web3
+import asyncio
+import os
+from typing import Awaitable, Dict, Any, Optional, TypeVar
+import aiohttp
+from web3 import AsyncWeb3, Web3
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
+from src.blockchain.fee_oracle import FeeOracle
+from src.blockchain.nonce_manager import NonceManager
+
+
+T = TypeVar("T")
+
+# ERC20 balanceOf, for token balances (USDC)
+BALANCE_OF_ABI = [{
+    "inputs": [{"name": "account", "type": "address"}],
+    "name": "balanceOf",
+    "outputs": [{"name": "", "type": "uint256"}],
+    "type": "function"
+}]
 
 
 class ArcClient:
@@ -46,15 +65,8 @@ class ArcClient:
         """
         if token_address:
             # ERC20 balance (USDC)
-            abi = [{
-                "inputs": [{"name": "account", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"name": "", "type": "uint256"}],
-                "type": "function"
-            }]
-            
             try:
-                contract = self.w3.eth.contract(address=token_address, abi=abi)
+                contract = self.w3.eth.contract(address=token_address, abi=BALANCE_OF_ABI)
                 balance_wei = contract.functions.balanceOf(address).call()
                 
                 # USDC has 6 decimals
@@ -73,13 +85,15 @@ class ArcClient:
                 print(f"Error getting native balance: {e}")
                 return 0.0
     
-    async def send_transaction(
+    def send_transaction(
         self,
         contract_address: str,
         function_name: str,
         function_args: list,
         abi: list,
-        from_address: Optional[str] = None
+        from_address: Optional[str] = None,
+        gas: Optional[int] = None,
+        gas_price: Optional[int] = None
     ) -> str:
         """
         Send transaction to smart contract
@@ -90,6 +104,8 @@ class ArcClient:
             function_args: Function arguments
             abi: Contract ABI
             from_address: Address to send from (uses account if not provided)
+            gas: Gas limit (e.g. from a confirmed quote; defaults to 200000)
+            gas_price: Gas price in wei (e.g. from a confirmed quote; fetched if not provided)
             
         Returns:
             Transaction hash
@@ -107,8 +123,8 @@ class ArcClient:
             transaction = function(*function_args).build_transaction({
                 'from': from_addr,
                 'nonce': self.w3.eth.get_transaction_count(from_addr),
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price,
+                'gas': gas or 200000,
+                'gasPrice': gas_price or self.w3.eth.gas_price,
             })
             
             # Sign transaction
@@ -140,3 +156,231 @@ class ArcClient:
             print(f"Error getting transaction receipt: {e}")
             return {}
 
+
+
+class AsyncArcClient:
+    """Non-blocking client for interacting with Arc blockchain"""
+    
+    DEFAULT_TIMEOUT = 10.0         # seconds per RPC call
+    DEFAULT_MAX_CONNECTIONS = 100  # pooled connections to the RPC endpoint
+    
+    def __init__(
+        self,
+        rpc_url: str,
+        private_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None
+    ):
+        """
+        Initialize async Arc client
+        
+        The pooled session is opened on the first call, inside the running event loop.
+        
+        Args:
+            rpc_url: Arc RPC URL
+            private_key: Private key for signing transactions (optional)
+            timeout: Default per-call timeout in seconds (falls back to ARC_RPC_TIMEOUT)
+            max_connections: Connection pool size (falls back to ARC_RPC_MAX_CONNECTIONS)
+        """
+        self.rpc_url = rpc_url
+        self.timeout = timeout or float(os.getenv("ARC_RPC_TIMEOUT", self.DEFAULT_TIMEOUT))
+        self.max_connections = max_connections or int(
+            os.getenv("ARC_RPC_MAX_CONNECTIONS", self.DEFAULT_MAX_CONNECTIONS)
+        )
+        
+        self.provider = AsyncWeb3.AsyncHTTPProvider(
+            rpc_url, request_kwargs={"timeout": aiohttp.ClientTimeout(total=self.timeout)}
+        )
+        self.w3 = AsyncWeb3(self.provider)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._chain_id: Optional[int] = None
+        self._chain_id_lock = asyncio.Lock()
+        self.nonces = NonceManager(self)
+        self.fees = FeeOracle(self)
+        
+        if private_key:
+            self.account: LocalAccount = Account.from_key(private_key)
+        else:
+            self.account = None
+    
+    async def _ensure_session(self):
+        """Open the shared connection pool and register it with the provider"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                raise_for_status=True
+            )
+            await self.provider.cache_async_session(self._session)
+    
+    async def call(self, request: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Await an RPC request under a per-call timeout
+        
+        Args:
+            request: Awaitable web3 call (e.g. w3.eth.get_balance(address))
+            timeout: Timeout in seconds (defaults to the client timeout)
+            
+        Returns:
+            Result of the request
+        """
+        await self._ensure_session()
+        return await asyncio.wait_for(request, timeout=timeout or self.timeout)
+    
+    async def chain_id(self) -> int:
+        """
+        Get the chain id, fetched once and then cached (it never changes for an endpoint)
+        
+        Returns:
+            Chain id
+        """
+        if self._chain_id is None:
+            async with self._chain_id_lock:
+                if self._chain_id is None:
+                    self._chain_id = await self.call(self.w3.eth.chain_id)
+        return self._chain_id
+    
+    async def is_connected(self) -> bool:
+        """Check if connected to blockchain"""
+        try:
+            return await self.call(self.w3.is_connected())
+        except Exception:
+            return False
+    
+    async def get_balance(self, address: str, token_address: Optional[str] = None) -> float:
+        """
+        Get balance for an address
+        
+        Args:
+            address: Address to check
+            token_address: Token contract address (None for native token)
+            
+        Returns:
+            Balance as float
+        """
+        if token_address:
+            # ERC20 balance (USDC)
+            try:
+                contract = self.w3.eth.contract(address=token_address, abi=BALANCE_OF_ABI)
+                balance_wei = await self.call(contract.functions.balanceOf(address).call())
+                
+                # USDC has 6 decimals
+                return balance_wei / 10**6
+            except Exception as e:
+                print(f"Error getting token balance: {e}")
+                return 0.0
+        else:
+            # Native token balance
+            try:
+                balance_wei = await self.call(self.w3.eth.get_balance(address))
+                return float(self.w3.from_wei(balance_wei, "ether"))
+            except Exception as e:
+                print(f"Error getting native balance: {e}")
+                return 0.0
+    
+    async def send_transaction(
+        self,
+        contract_address: str,
+        function_name: str,
+        function_args: list,
+        abi: list,
+        from_address: Optional[str] = None,
+        gas: Optional[int] = None,
+        gas_price: Optional[int] = None,
+        max_fee: Optional[int] = None,
+        max_priority_fee: Optional[int] = None
+    ) -> str:
+        """
+        Send transaction to smart contract
+        
+        Fees not given (e.g. by a confirmed quote) come from the fee oracle:
+        EIP-1559 fees, or the gas price on legacy chains.
+        
+        Args:
+            contract_address: Contract address
+            function_name: Function name to call
+            function_args: Function arguments
+            abi: Contract ABI
+            from_address: Address to send from (uses account if not provided)
+            gas: Gas limit (e.g. from a confirmed quote; defaults to 200000)
+            gas_price: Legacy gas price in wei
+            max_fee: EIP-1559 maxFeePerGas in wei (with max_priority_fee)
+            max_priority_fee: EIP-1559 maxPriorityFeePerGas in wei
+            
+        Returns:
+            Transaction hash
+        """
+        if not self.account:
+            raise ValueError("Private key required for sending transactions")
+        
+        from_addr = from_address or self.account.address
+        nonce: Optional[int] = None
+        
+        try:
+            contract = self.w3.eth.contract(address=contract_address, abi=abi)
+            function = getattr(contract.functions, function_name)
+            
+            # Chain id and fees are usually cached, so allocating the nonce first costs nothing
+            nonce = await self.nonces.allocate(from_addr)
+            if max_fee:
+                chain_id = await self.chain_id()
+                fee_fields = {'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': max_priority_fee or 0}
+            elif gas_price:
+                chain_id = await self.chain_id()
+                fee_fields = {'gasPrice': gas_price}
+            else:
+                chain_id, fees = await asyncio.gather(self.chain_id(), self.fees.get_fees())
+                if fees["eip1559"]:
+                    fee_fields = {
+                        'maxFeePerGas': fees["max_fee"],
+                        'maxPriorityFeePerGas': fees["max_priority_fee"],
+                    }
+                else:
+                    fee_fields = {'gasPrice': fees["gas_price"]}
+            
+            # Build transaction (no RPC: chain id, gas and fees are already set)
+            transaction = await function(*function_args).build_transaction({
+                'from': from_addr,
+                'chainId': chain_id,
+                'nonce': nonce,
+                'gas': gas or 200000,
+                **fee_fields,
+            })
+            
+            # Sign transaction
+            signed = self.account.sign_transaction(transaction)
+            
+            # Send transaction
+            tx_hash = await self.call(self.w3.eth.send_raw_transaction(signed.rawTransaction))
+            self.nonces.release(from_addr)
+            
+            return tx_hash.hex()
+            
+        except BaseException as e:
+            # The nonce may be unused (a gap) or stale; the manager resyncs with the chain
+            if nonce is not None:
+                self.nonces.release(from_addr, e)
+            if isinstance(e, Exception):
+                print(f"Error sending transaction: {e}")
+            raise
+    
+    async def get_transaction_receipt(self, tx_hash: str) -> Dict[str, Any]:
+        """
+        Get transaction receipt
+        
+        Args:
+            tx_hash: Transaction hash
+            
+        Returns:
+            Transaction receipt
+        """
+        try:
+            receipt = await self.call(self.w3.eth.get_transaction_receipt(tx_hash))
+            return dict(receipt)
+        except Exception as e:
+            print(f"Error getting transaction receipt: {e}")
+            return {}
+    
+    async def close(self):
+        """Close the connection pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -1,30 +1,282 @@
 """
 Contract Caller - Calls smart contract functions
 """
-from typing import Dict, Any, List, Optional
-from src.blockchain.arc_client import ArcClient
+import asyncio
+import os
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+from eth_abi import decode
+from web3 import Web3
+from src.ai.safety import SafetyChecker
+from src.blockchain.arc_client import AsyncArcClient
+from src.utils.lane_scheduler import LaneScheduler
+from src.utils.micro_batcher import MicroBatcher
 
 
 class ContractCaller:
     """Calls smart contract functions"""
     
-    def __init__(self, arc_client: ArcClient, contracts_config: Dict[str, Any]):
+    BATCH_BASE_GAS = 50000  # batchPayments overhead on top of the per-payment gas
+    ZERO_ADDRESS = "0x" + "0" * 40
+    # PaymentRouter event emitted once per payment (from and to are indexed topics)
+    PAYMENT_EXECUTED_TOPIC = Web3.keccak(text="PaymentExecuted(address,address,uint256,string,uint256)")
+    
+    def __init__(
+        self,
+        arc_client: AsyncArcClient,
+        contracts_config: Dict[str, Any],
+        lanes: Optional[LaneScheduler] = None,
+        aggregation: Optional[bool] = None
+    ):
         """
         Initialize contract caller
         
         Args:
             arc_client: Arc blockchain client
             contracts_config: Contract configuration with addresses and ABIs
+            lanes: Per-sender submission lanes (bounded by TX_LANE_MAX_QUEUE)
+            aggregation: Coalesce a sender's payments arriving within TX_AGGREGATION_WINDOW_MS
+                into one batchPayments transaction (defaults to the TX_AGGREGATION env var)
         """
         self.arc = arc_client
         self.contracts = contracts_config
+        self.lanes = lanes or LaneScheduler(
+            max_queue=int(os.getenv("TX_LANE_MAX_QUEUE", "100")),
+            idle_seconds=float(os.getenv("TX_LANE_IDLE_SECONDS", "60"))
+        )
+        
+        if aggregation is None:
+            aggregation = os.getenv("TX_AGGREGATION", "false").lower() == "true"
+        self.aggregation = aggregation
+        self.aggregation_window_ms = float(os.getenv("TX_AGGREGATION_WINDOW_MS", "50"))
+        self.batch_gas_per_payment = int(os.getenv("TX_BATCH_GAS_PER_PAYMENT", "60000"))
+        # Largest batch whose gas limit stays within TX_AGGREGATION_MAX_GAS
+        self.aggregation_max_size = max(1, (
+            int(os.getenv("TX_AGGREGATION_MAX_GAS", "3000000")) - self.BATCH_BASE_GAS
+        ) // self.batch_gas_per_payment)
+        self.receipt_timeout = float(os.getenv("TX_RECEIPT_TIMEOUT", "60"))
+        self._aggregators: Dict[str, MicroBatcher] = {}
+        # "batches", "payments" (sent in batches), "failed_batches" (send errors, never resent),
+        # "reverted_batches" and "unconfirmed_batches" (no receipt within the timeout)
+        self.aggregation_counts: Counter = Counter()
+    
+    def _sender(self, from_address: Optional[str]) -> str:
+        """Address a transaction is sent from"""
+        return from_address or (self.arc.account.address if self.arc.account else "")
+    
+    def _batch_gas(self, num_payments: int) -> int:
+        """Gas limit for a batchPayments call"""
+        return self.BATCH_BASE_GAS + num_payments * self.batch_gas_per_payment
+    
+    async def _send_transaction(self, **kwargs) -> str:
+        """
+        Submit a transaction through its sender's lane
+        
+        Transactions from one sender go out one at a time, in arrival order;
+        different senders submit in parallel.
+        
+        Args:
+            **kwargs: Arguments for AsyncArcClient.send_transaction
+        
+        Returns:
+            Transaction hash
+        """
+        sender = self._sender(kwargs.get("from_address"))
+        return await self.lanes.submit(sender, lambda: self.arc.send_transaction(**kwargs))
+    
+    async def _send_router_call(
+        self,
+        function_name: str,
+        function_args: list,
+        from_address: Optional[str] = None,
+        gas: Optional[int] = None
+    ) -> str:
+        """Submit a PaymentRouter call through the sender's lane"""
+        contract_config = self.contracts["PaymentRouter"]
+        return await self._send_transaction(
+            contract_address=contract_config["address"],
+            function_name=function_name,
+            function_args=function_args,
+            abi=contract_config["abi"],
+            from_address=from_address,
+            gas=gas
+        )
+    
+    def _aggregator(self, sender: str) -> MicroBatcher:
+        """Get (or create) the payment batcher for a sender"""
+        batcher = self._aggregators.get(sender)
+        if batcher is None:
+            batcher = self._aggregators[sender] = MicroBatcher(
+                lambda items: self._send_aggregated(sender, items),
+                max_batch_size=self.aggregation_max_size,
+                max_wait_ms=self.aggregation_window_ms
+            )
+        return batcher
+    
+    def _check_payment(self, recipient: str, amount_usdc: int):
+        """
+        Reject a payment that the router would revert (failing a whole batch) or that is over the limit
+        
+        The router has no per-transfer cap, so the single-transaction limit is enforced here
+        for every payment, batched or not.
+        
+        Args:
+            recipient: Recipient address
+            amount_usdc: Amount in USDC units
+        
+        Raises:
+            ValueError: If the recipient is not a usable address or the amount is out of range
+        """
+        if not Web3.is_address(recipient) or int(recipient, 16) == 0:
+            raise ValueError(f"Invalid recipient address: {recipient}")
+        if amount_usdc <= 0:
+            raise ValueError("Payment amount must be positive")
+        if amount_usdc > SafetyChecker.MAX_SINGLE_TRANSACTION * 10**6:
+            raise ValueError(
+                f"Payment exceeds the single transaction limit of ${SafetyChecker.MAX_SINGLE_TRANSACTION:,}"
+            )
+    
+    async def _send_aggregated(self, sender: str, payments: List[Tuple[str, int, str]]) -> List[Any]:
+        """
+        Send a sender's coalesced payments, as one batchPayments transaction when there are several
+        
+        A failed batch is never resent payment by payment: the error may come after
+        the transaction was broadcast, and resending could pay twice. Once sent, the
+        batch's receipt decides each payment's result.
+        
+        Args:
+            sender: Sender address
+            payments: (recipient, amount in USDC units, memo) per caller
+        
+        Returns:
+            One result per payment: its transaction hash, or the exception that failed it
+        """
+        from_address = sender or None
+        if len(payments) == 1:
+            tx_hash = await self._send_router_call('sendPayment', list(payments[0]), from_address)
+            return [await self._confirmed(tx_hash)]
+        
+        recipients, amounts_usdc, memos = (list(column) for column in zip(*payments))
+        try:
+            tx_hash = await self._send_router_call(
+                'batchPayments', [recipients, amounts_usdc, memos], from_address, gas=self._batch_gas(len(payments))
+            )
+        except Exception as e:
+            print(f"Error sending batch of {len(payments)} payments: {e}")
+            self.aggregation_counts["failed_batches"] += 1
+            raise
+        
+        self.aggregation_counts["batches"] += 1
+        self.aggregation_counts["payments"] += len(payments)
+        return await self._batch_results(tx_hash, payments)
+    
+    async def _batch_results(self, tx_hash: str, payments: List[Tuple[str, int, str]]) -> List[Any]:
+        """
+        Per-payment results of a sent batch, from its receipt's PaymentExecuted events
+        
+        Args:
+            tx_hash: Batch transaction hash
+            payments: (recipient, amount in USDC units, memo) per caller
+        
+        Returns:
+            The transaction hash for each executed payment (also when no receipt arrives
+            in time, as the batch may still be mined), an exception for each one that was not
+        """
+        receipt = await self._wait_for_receipt(tx_hash)
+        if receipt is None:
+            self.aggregation_counts["unconfirmed_batches"] += 1
+            return [tx_hash] * len(payments)
+        
+        if receipt["status"] != 1:
+            self.aggregation_counts["reverted_batches"] += 1
+            return [RuntimeError(f"Batch transaction {tx_hash} reverted")] * len(payments)
+        
+        # Amounts executed per recipient, matched against the callers' payments
+        router_address = self.contracts["PaymentRouter"]["address"].lower()
+        executed: Counter = Counter()
+        for log in receipt["logs"]:
+            topics = log["topics"]
+            if log["address"].lower() != router_address or len(topics) < 3 or topics[0] != self.PAYMENT_EXECUTED_TOPIC:
+                continue
+            recipient = Web3.to_checksum_address(bytes(topics[2])[-20:])
+            amount, _, _ = decode(["uint256", "string", "uint256"], bytes(log["data"]))
+            executed[(recipient, amount)] += 1
+        
+        results: List[Any] = []
+        for recipient, amount_usdc, _ in payments:
+            key = (Web3.to_checksum_address(recipient), amount_usdc)
+            if executed[key] > 0:
+                executed[key] -= 1
+                results.append(tx_hash)
+            else:
+                results.append(RuntimeError(f"Payment to {recipient} not executed in batch {tx_hash}"))
+        return results
+    
+    async def _wait_for_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Receipt of a sent transaction, or None if none arrives within TX_RECEIPT_TIMEOUT"""
+        try:
+            return await self.arc.call(
+                self.arc.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout),
+                timeout=self.receipt_timeout + self.arc.timeout
+            )
+        except Exception as e:
+            print(f"Error waiting for receipt {tx_hash}: {e}")
+            return None
+    
+    async def _confirmed(self, tx_hash: str) -> str:
+        """
+        Wait for a sent payment transaction to be mined
+        
+        Every payment path returns this way, aggregated or not.
+        
+        Args:
+            tx_hash: Transaction hash
+        
+        Returns:
+            The transaction hash (also when no receipt arrives in time, as it may still be mined)
+        
+        Raises:
+            RuntimeError: If the transaction reverted
+        """
+        receipt = await self._wait_for_receipt(tx_hash)
+        if receipt is not None and receipt["status"] != 1:
+            raise RuntimeError(f"Transaction {tx_hash} reverted")
+        return tx_hash
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get transaction submission statistics
+        
+        Returns:
+            Dictionary with per-sender lane, nonce allocation, fee cache and payment aggregation statistics
+        """
+        batches = self.aggregation_counts["batches"]
+        return {
+            "lanes": self.lanes.get_stats(),
+            "nonces": self.arc.nonces.get_stats(),
+            "fees": self.arc.fees.get_stats(),
+            "aggregation": {
+                "enabled": self.aggregation,
+                "batches": batches,
+                "payments": self.aggregation_counts["payments"],
+                "failed_batches": self.aggregation_counts["failed_batches"],
+                "reverted_batches": self.aggregation_counts["reverted_batches"],
+                "unconfirmed_batches": self.aggregation_counts["unconfirmed_batches"],
+                "avg_batch_size": self.aggregation_counts["payments"] / batches if batches else 0.0,
+                "max_batch_size": self.aggregation_max_size
+            }
+        }
     
     async def send_payment(
         self,
         recipient: str,
         amount: float,
         memo: str = "",
-        from_address: Optional[str] = None
+        from_address: Optional[str] = None,
+        gas: Optional[int] = None,
+        gas_price: Optional[int] = None,
+        max_fee: Optional[int] = None,
+        max_priority_fee: Optional[int] = None
     ) -> str:
         """
         Call PaymentRouter.sendPayment()
@@ -34,9 +286,17 @@ class ContractCaller:
             amount: Amount in USD
             memo: Payment memo/description
             from_address: Sender address
-            
+            gas: Gas limit from a quote (optional)
+            gas_price: Legacy gas price in wei from a quote (optional)
+            max_fee: EIP-1559 max fee per gas in wei from a quote (optional)
+            max_priority_fee: EIP-1559 max priority fee per gas in wei from a quote (optional)
+        
         Returns:
-            Transaction hash
+            Transaction hash, returned once mined (shared by every payment in an aggregated batch)
+        
+        Raises:
+            ValueError: If the recipient is not a usable address or the amount is out of range
+            RuntimeError: If the transaction reverted, or an aggregated batch did not execute the payment
         """
         if "PaymentRouter" not in self.contracts:
             raise ValueError("PaymentRouter not configured")
@@ -50,15 +310,167 @@ class ContractCaller:
         usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
         amount_usdc = usdc_handler.to_usdc_amount(amount)
         
-        tx_hash = await self.arc.send_transaction(
+        self._check_payment(recipient, amount_usdc)
+        if self.aggregation and gas is None and gas_price is None and max_fee is None:
+            # Quoted payments keep their quoted gas; others may share a batch with the sender's concurrent payments
+            return await self._aggregator(self._sender(from_address)).submit((recipient, amount_usdc, memo))
+        
+        tx_hash = await self._send_transaction(
             contract_address=contract_address,
             function_name='sendPayment',
             function_args=[recipient, amount_usdc, memo],
             abi=abi,
-            from_address=from_address
+            from_address=from_address,
+            gas=gas,
+            gas_price=gas_price,
+            max_fee=max_fee,
+            max_priority_fee=max_priority_fee
         )
         
-        return tx_hash
+        return await self._confirmed(tx_hash)
+    
+    async def estimate_payment(
+        self,
+        recipient: str,
+        amount: float,
+        memo: str = "",
+        from_address: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Estimate gas limit and fees for PaymentRouter.sendPayment()
+        
+        Args:
+            recipient: Recipient address
+            amount: Amount in USD
+            memo: Payment memo/description
+            from_address: Sender address
+        
+        Returns:
+            Dictionary with gas (limit, buffered) and quote fees: max_fee and max_priority_fee
+            (EIP-1559 chains) or gas_price (wei)
+        """
+        from src.blockchain.usdc_handler import USDCHandler
+        usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
+        
+        return await self._estimate_router_call(
+            'sendPayment', [recipient, usdc_handler.to_usdc_amount(amount), memo], from_address
+        )
+    
+    async def estimate_batch_payments(
+        self,
+        recipients: List[str],
+        amounts: List[float],
+        memos: List[str],
+        from_address: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Estimate gas limit and fees for PaymentRouter.batchPayments()
+        
+        Args:
+            recipients: Recipient addresses
+            amounts: Amounts in USD, one per recipient
+            memos: Memos, one per recipient
+            from_address: Sender address
+        
+        Returns:
+            Dictionary with gas (limit, buffered) and quote fees: max_fee and max_priority_fee
+            (EIP-1559 chains) or gas_price (wei)
+        """
+        from src.blockchain.usdc_handler import USDCHandler
+        usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
+        
+        return await self._estimate_router_call(
+            'batchPayments', [recipients, [usdc_handler.to_usdc_amount(a) for a in amounts], memos], from_address,
+            default_gas=self._batch_gas(len(recipients))
+        )
+    
+    async def _estimate_router_call(
+        self,
+        function_name: str,
+        function_args: list,
+        from_address: Optional[str],
+        default_gas: int = 200000
+    ) -> Dict[str, int]:
+        """Estimate gas limit (default_gas if estimation fails) and quote fees for a PaymentRouter call"""
+        if "PaymentRouter" not in self.contracts:
+            raise ValueError("PaymentRouter not configured")
+        
+        contract_config = self.contracts["PaymentRouter"]
+        
+        from src.blockchain.gas_estimator import GasEstimator
+        gas_estimator = GasEstimator(self.arc)
+        
+        gas, fees = await asyncio.gather(
+            gas_estimator.estimate_gas(
+                contract_address=contract_config["address"],
+                function_name=function_name,
+                function_args=function_args,
+                abi=contract_config["abi"],
+                from_address=from_address,
+                default_gas=default_gas
+            ),
+            gas_estimator.quote_fees()
+        )
+        return {"gas": gas, **fees}
+    
+    async def batch_payments(
+        self,
+        recipients: List[str],
+        amounts: List[float],
+        memos: List[str],
+        from_address: Optional[str] = None,
+        gas: Optional[int] = None,
+        gas_price: Optional[int] = None,
+        max_fee: Optional[int] = None,
+        max_priority_fee: Optional[int] = None
+    ) -> str:
+        """
+        Call PaymentRouter.batchPayments() - several payments in one transaction
+        
+        Args:
+            recipients: Recipient addresses
+            amounts: Amounts in USD, one per recipient
+            memos: Memos, one per recipient
+            from_address: Sender address
+            gas: Gas limit from a quote (optional; sized by payment count otherwise)
+            gas_price: Legacy gas price in wei from a quote (optional)
+            max_fee: EIP-1559 max fee per gas in wei from a quote (optional)
+            max_priority_fee: EIP-1559 max priority fee per gas in wei from a quote (optional)
+        
+        Returns:
+            Transaction hash, returned once mined
+        
+        Raises:
+            ValueError: If a recipient is not a usable address or an amount is out of range
+            RuntimeError: If the transaction reverted
+        """
+        if "PaymentRouter" not in self.contracts:
+            raise ValueError("PaymentRouter not configured")
+        
+        contract_config = self.contracts["PaymentRouter"]
+        contract_address = contract_config["address"]
+        abi = contract_config["abi"]
+        
+        # Convert amounts to USDC (6 decimals)
+        from src.blockchain.usdc_handler import USDCHandler
+        usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
+        amounts_usdc = [usdc_handler.to_usdc_amount(amt) for amt in amounts]
+        for recipient, amount_usdc in zip(recipients, amounts_usdc):
+            self._check_payment(recipient, amount_usdc)
+        
+        tx_hash = await self._send_transaction(
+            contract_address=contract_address,
+            function_name='batchPayments',
+            function_args=[recipients, amounts_usdc, memos],
+            abi=abi,
+            from_address=from_address,
+            gas=gas or self._batch_gas(len(recipients)),
+            gas_price=gas_price,
+            max_fee=max_fee,
+            max_priority_fee=max_priority_fee
+        )
+        
+        return await self._confirmed(tx_hash)
     
     async def split_payment(
         self,
@@ -75,7 +487,7 @@ class ContractCaller:
             amounts: List of amounts in USD
             memo: Payment memo/description
             from_address: Sender address
-            
+        
         Returns:
             Transaction hash
         """
@@ -91,7 +503,7 @@ class ContractCaller:
         usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
         amounts_usdc = [usdc_handler.to_usdc_amount(amt) for amt in amounts]
         
-        tx_hash = await self.arc.send_transaction(
+        tx_hash = await self._send_transaction(
             contract_address=contract_address,
             function_name='splitPayment',
             function_args=[recipients, amounts_usdc, memo],
@@ -120,7 +532,7 @@ class ContractCaller:
             description: Escrow description
             requires_milestone: Whether milestone is required
             from_address: Sender address
-            
+        
         Returns:
             Transaction hash
         """
@@ -136,7 +548,7 @@ class ContractCaller:
         usdc_handler = USDCHandler(self.arc, self.contracts.get("USDC", {}).get("address", ""))
         amount_usdc = usdc_handler.to_usdc_amount(amount)
         
-        tx_hash = await self.arc.send_transaction(
+        tx_hash = await self._send_transaction(
             contract_address=contract_address,
             function_name='createEscrow',
             function_args=[
@@ -152,4 +564,3 @@ class ContractCaller:
         )
         
         return tx_hash
-
@@ -0,0 +1,133 @@
+"""
+Fee Oracle - Caches fee suggestions so concurrent transactions share one fee lookup
+
+Fees are refreshed at most once per TTL (about one block) from eth_feeHistory:
+the next block's base fee plus a percentile of recent priority fees gives
+EIP-1559 maxFeePerGas / maxPriorityFeePerGas. Chains without feeHistory fall
+back to eth_gasPrice.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from src.blockchain.arc_client import AsyncArcClient
+
+
+class FeeOracle:
+    """Serves gas price and EIP-1559 fee suggestions from a short-lived cache"""
+    
+    DEFAULT_TTL = 2.0                # seconds; roughly one block
+    DEFAULT_HISTORY_BLOCKS = 10      # blocks of priority fees considered
+    DEFAULT_PRIORITY_PERCENTILE = 50
+    
+    def __init__(
+        self,
+        arc_client: "AsyncArcClient",
+        ttl: Optional[float] = None,
+        history_blocks: Optional[int] = None,
+        priority_percentile: Optional[float] = None
+    ):
+        """
+        Initialize fee oracle
+        
+        Args:
+            arc_client: Async Arc blockchain client
+            ttl: Seconds a fee snapshot is served (falls back to FEE_CACHE_TTL)
+            history_blocks: Blocks of fee history to sample (falls back to FEE_HISTORY_BLOCKS)
+            priority_percentile: Priority fee percentile to suggest (falls back to FEE_PRIORITY_PERCENTILE)
+        """
+        self.arc = arc_client
+        self.ttl = ttl or float(os.getenv("FEE_CACHE_TTL", self.DEFAULT_TTL))
+        self.history_blocks = history_blocks or int(os.getenv("FEE_HISTORY_BLOCKS", self.DEFAULT_HISTORY_BLOCKS))
+        self.priority_percentile = priority_percentile or float(
+            os.getenv("FEE_PRIORITY_PERCENTILE", self.DEFAULT_PRIORITY_PERCENTILE)
+        )
+        self._fees: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        # "hits" (served from cache), "refreshes" (fee RPCs), "errors"
+        self.counts: Counter = Counter()
+    
+    async def get_fees(self) -> Dict[str, Any]:
+        """
+        Get current fee suggestions
+        
+        Returns:
+            Dictionary with eip1559 (bool), gas_price, and when eip1559 is true
+            base_fee, max_priority_fee and max_fee (all wei), plus the block they are based on
+        """
+        if self._fees is not None and time.monotonic() - self._fetched_at < self.ttl:
+            self.counts["hits"] += 1
+            return self._fees
+        
+        async with self._lock:
+            # Another caller may have refreshed while this one waited
+            if self._fees is not None and time.monotonic() - self._fetched_at < self.ttl:
+                self.counts["hits"] += 1
+                return self._fees
+            
+            try:
+                self._fees = await self._fetch()
+                self._fetched_at = time.monotonic()
+                self.counts["refreshes"] += 1
+            except Exception as e:
+                self.counts["errors"] += 1
+                if self._fees is None:
+                    raise
+                print(f"Error refreshing fees, serving last known fees: {e}")
+            return self._fees
+    
+    async def gas_price(self) -> int:
+        """
+        Get a legacy gas price suggestion
+        
+        Returns:
+            Gas price in wei
+        """
+        return (await self.get_fees())["gas_price"]
+    
+    async def _fetch(self) -> Dict[str, Any]:
+        """Query fee history (or the legacy gas price on chains without EIP-1559)"""
+        try:
+            history = await self.arc.call(
+                self.arc.w3.eth.fee_history(self.history_blocks, "latest", [self.priority_percentile])
+            )
+        except Exception as e:
+            print(f"Error getting fee history, using eth_gasPrice: {e}")
+            history = None
+        
+        base_fees = (history or {}).get("baseFeePerGas") or []
+        if not base_fees or not any(base_fees):
+            gas_price = await self.arc.call(self.arc.w3.eth.gas_price)
+            return {"eip1559": False, "gas_price": gas_price, "block": None}
+        
+        rewards = sorted(reward[0] for reward in history.get("reward") or [] if reward)
+        max_priority_fee = rewards[len(rewards) // 2] if rewards else 0
+        # The last entry is the next block's base fee; 2x covers several full blocks of increases
+        base_fee = base_fees[-1]
+        return {
+            "eip1559": True,
+            "base_fee": base_fee,
+            "max_priority_fee": max_priority_fee,
+            "max_fee": 2 * base_fee + max_priority_fee,
+            # Legacy transactions pay their full gas price, so it carries no headroom
+            "gas_price": base_fee + max_priority_fee,
+            "block": history["oldestBlock"] + len(base_fees) - 2
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get fee cache statistics
+        
+        Returns:
+            Dictionary with cache hits, refreshes, errors and the current fee snapshot
+        """
+        return {
+            "hits": self.counts["hits"],
+            "refreshes": self.counts["refreshes"],
+            "errors": self.counts["errors"],
+            "fees": self._fees
+        }
@@ -2,13 +2,13 @@
 Gas Estimator - Estimates gas costs for transactions
 """
 from typing import Dict, Any
-from src.blockchain.arc_client import ArcClient
+from src.blockchain.arc_client import AsyncArcClient
 
 
 class GasEstimator:
     """Estimates gas costs for transactions"""
     
-    def __init__(self, arc_client: ArcClient):
+    def __init__(self, arc_client: AsyncArcClient):
         """
         Initialize gas estimator
         
@@ -17,13 +17,14 @@ class GasEstimator:
         """
         self.arc = arc_client
     
-    def estimate_gas(
+    async def estimate_gas(
         self,
         contract_address: str,
         function_name: str,
         function_args: list,
         abi: list,
-        from_address: str
+        from_address: str,
+        default_gas: int = 200000
     ) -> int:
         """
         Estimate gas for a transaction
@@ -34,6 +35,7 @@ class GasEstimator:
             function_args: Function arguments
             abi: Contract ABI
             from_address: From address
+            default_gas: Gas limit to return if estimation fails
             
         Returns:
             Estimated gas
@@ -42,9 +44,9 @@ class GasEstimator:
             contract = self.arc.w3.eth.contract(address=contract_address, abi=abi)
             function = getattr(contract.functions, function_name)
             
-            gas_estimate = function(*function_args).estimate_gas({
+            gas_estimate = await self.arc.call(function(*function_args).estimate_gas({
                 'from': from_address
-            })
+            }))
             
             # Add 20% buffer
             return int(gas_estimate * 1.2)
@@ -52,18 +54,47 @@ class GasEstimator:
         except Exception as e:
             print(f"Error estimating gas: {e}")
             # Return default gas
-            return 200000
+            return default_gas
     
-    def get_gas_price(self) -> int:
+    async def get_gas_price(self) -> int:
         """
-        Get current gas price
+        Get current gas price (cached for about a block by the fee oracle)
         
         Returns:
             Gas price in wei
         """
         try:
-            return self.arc.w3.eth.gas_price
+            return await self.arc.fees.gas_price()
         except Exception as e:
             print(f"Error getting gas price: {e}")
             return 1000000000  # Default 1 gwei
-
+    
+    async def suggest_fees(self) -> Dict[str, Any]:
+        """
+        Get EIP-1559 fee suggestions (cached for about a block by the fee oracle)
+        
+        Returns:
+            Dictionary with eip1559, gas_price and, on EIP-1559 chains, base_fee,
+            max_priority_fee and max_fee (wei)
+        """
+        return await self.arc.fees.get_fees()
+    
+    async def quote_fees(self) -> Dict[str, int]:
+        """
+        Get the fee fields to fix in a quote, which may be sent up to QUOTE_TTL later
+        
+        EIP-1559 chains get max fees (headroom for a rising base fee, while only
+        the actual base fee is paid); other chains get the node's gas price.
+        
+        Returns:
+            Dictionary with max_fee and max_priority_fee (EIP-1559) or gas_price (wei)
+        """
+        try:
+            fees = await self.arc.fees.get_fees()
+        except Exception as e:
+            print(f"Error getting fee suggestions: {e}")
+            return {"gas_price": await self.get_gas_price()}
+        
+        if fees["eip1559"]:
+            return {"max_fee": fees["max_fee"], "max_priority_fee": fees["max_priority_fee"]}
+        return {"gas_price": fees["gas_price"]}
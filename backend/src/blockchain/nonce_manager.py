@@ -0,0 +1,120 @@
+"""
+Nonce Manager - Allocates transaction nonces locally for each sending account
+
+The chain is asked for an account's pending transaction count only on first
+use and after a failed send; every other nonce comes from a local counter,
+so concurrent sends from one account get distinct nonces without waiting
+for each other.
+
+The counters live in this process: an account must only send from one
+worker (or one process per account), or two processes will hand out the
+same nonces.
+"""
+import asyncio
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from src.blockchain.arc_client import AsyncArcClient
+
+
+class NonceManager:
+    """Hands out sequential nonces per account and resyncs with the chain after errors"""
+    
+    # Node errors meaning the chain is already past our counter
+    NONCE_TOO_LOW_PATTERN = re.compile(r"nonce too low|already known|known transaction", re.IGNORECASE)
+    
+    def __init__(self, arc_client: "AsyncArcClient"):
+        """
+        Initialize nonce manager
+        
+        Args:
+            arc_client: Async Arc blockchain client
+        """
+        self.arc = arc_client
+        self._next: Dict[str, int] = {}
+        self._in_flight: Counter = Counter()
+        # Accounts due a chain lookup: "chain" (take the chain's count once idle) or
+        # "max" (counter is behind the chain; catch up even with sends in flight)
+        self._pending_resync: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # "allocated", "syncs" (chain lookups), "resyncs" (lookups after an error)
+        self.counts: Counter = Counter()
+    
+    async def allocate(self, address: str) -> int:
+        """
+        Reserve the next nonce for an account
+        
+        Every allocated nonce must be handed back with release() once its send
+        has finished, successfully or not.
+        
+        Args:
+            address: Sending account address
+        
+        Returns:
+            Nonce to use for the account's next transaction
+        """
+        lock = self._locks.setdefault(address, asyncio.Lock())
+        async with lock:
+            mode = self._pending_resync.get(address)
+            if address not in self._next:
+                self._next[address] = await self._chain_nonce(address)
+                self._pending_resync.pop(address, None)
+            elif mode == "max" or (mode == "chain" and not self._in_flight[address]):
+                # With nothing in flight the chain is the whole truth (an unused nonce is reused);
+                # otherwise only move forward, so in-flight nonces are never handed out again
+                chain = await self._chain_nonce(address)
+                self._next[address] = chain if mode == "chain" else max(self._next[address], chain)
+                self._pending_resync.pop(address, None)
+                self.counts["resyncs"] += 1
+            
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            self._in_flight[address] += 1
+            self.counts["allocated"] += 1
+            return nonce
+    
+    def release(self, address: str, error: Optional[Exception] = None):
+        """
+        Hand back an allocated nonce once its send has finished
+        
+        A failed send schedules a resync: after "nonce too low" the counter
+        catches up with the chain at the next allocation; any other failure
+        (the nonce may be unused, leaving a gap) re-reads the chain once no
+        other send from the account is in flight.
+        
+        Args:
+            address: Sending account address
+            error: The exception the send failed with, if it failed
+        """
+        self._in_flight[address] -= 1
+        if self._in_flight[address] <= 0:
+            del self._in_flight[address]
+        
+        if error is None:
+            return
+        if self.NONCE_TOO_LOW_PATTERN.search(str(error)):
+            self._pending_resync[address] = "max"
+        else:
+            self._pending_resync.setdefault(address, "chain")
+    
+    async def _chain_nonce(self, address: str) -> int:
+        """The account's next nonce according to the node ("pending" counts the mempool)"""
+        self.counts["syncs"] += 1
+        return await self.arc.call(self.arc.w3.eth.get_transaction_count(address, "pending"))
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get nonce allocation statistics
+        
+        Returns:
+            Dictionary with allocation, sync and resync counts, tracked accounts and sends in flight
+        """
+        return {
+            "allocated": self.counts["allocated"],
+            "syncs": self.counts["syncs"],
+            "resyncs": self.counts["resyncs"],
+            "accounts": len(self._next),
+            "in_flight": sum(self._in_flight.values())
+        }
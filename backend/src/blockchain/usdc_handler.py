@@ -2,7 +2,7 @@
 USDC Handler - Handles USDC token operations
 """
 from typing import Optional
-from src.blockchain.arc_client import ArcClient
+from src.blockchain.arc_client import AsyncArcClient
 
 
 class USDCHandler:
@@ -10,7 +10,7 @@ class USDCHandler:
     
     USDC_DECIMALS = 6
     
-    def __init__(self, arc_client: ArcClient, usdc_address: str):
+    def __init__(self, arc_client: AsyncArcClient, usdc_address: str):
         """
         Initialize USDC handler
         
@@ -21,7 +21,7 @@ class USDCHandler:
         self.arc = arc_client
         self.usdc_address = usdc_address
     
-    def get_balance(self, address: str) -> float:
+    async def get_balance(self, address: str) -> float:
         """
         Get USDC balance for an address
         
@@ -31,7 +31,7 @@ class USDCHandler:
         Returns:
             USDC balance
         """
-        return self.arc.get_balance(address, self.usdc_address)
+        return await self.arc.get_balance(address, self.usdc_address)
     
     def to_usdc_amount(self, amount_usd: float) -> int:
         """
@@ -1,19 +1,27 @@
 """
 Cache Service - Caching layer (using in-memory cache for now)
 """
-from typing import Optional, Any
-import json
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional, Any, Dict
+import time
 
 
 class CacheService:
-    """Service for caching operations"""
+    """Service for caching operations (bounded LRU with per-entry TTL)"""
     
-    def __init__(self):
-        """Initialize cache service"""
-        # In production, use Redis
-        self.cache: dict = {}
-        self.expiry: dict = {}
+    def __init__(self, max_entries: int = 10000, default_ttl: int = 300):
+        """
+        Initialize cache service
+        
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            default_ttl: Default time to live in seconds
+        """
+        # In production, use Redis (same get/set/delete/clear interface)
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.cache: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -21,43 +29,64 @@ class CacheService:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             Cached value or None
         """
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
             return None
         
         # Check expiry
-        if key in self.expiry:
-            if datetime.now() > self.expiry[key]:
-                del self.cache[key]
-                del self.expiry[key]
-                return None
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            del self.cache[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
         
-        return self.cache[key]
+        self.cache.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
     
-    def set(self, key: str, value: Any, ttl: int = 300):
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
         Set value in cache
         
         Args:
             key: Cache key
             value: Value to cache
-            ttl: Time to live in seconds (default 5 minutes)
+            ttl: Time to live in seconds (default: the cache's default_ttl)
         """
-        self.cache[key] = value
-        self.expiry[key] = datetime.now() + timedelta(seconds=ttl)
+        ttl = self.default_ttl if ttl is None else ttl
+        self.cache[key] = (time.monotonic() + ttl, value)
+        self.cache.move_to_end(key)
+        
+        # Evict least recently used entries
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+            self.stats["evictions"] += 1
     
     def delete(self, key: str):
         """Delete key from cache"""
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.expiry:
-            del self.expiry[key]
+        self.cache.pop(key, None)
     
     def clear(self):
         """Clear all cache"""
         self.cache.clear()
-        self.expiry.clear()
-
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with hits, misses, evictions, expirations, size and hit rate
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self.cache),
+            "max_entries": self.max_entries,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
@@ -0,0 +1,165 @@
+"""
+Quote Service - Signed, short-lived, single-use payment quotes for two-phase confirmation
+
+Redeemed quote ids must be visible to every worker, or one token could be
+confirmed once per process. With QUOTE_REDIS_URL set they are claimed in
+Redis (SET NX EX); without it the in-process store is only safe for a single
+worker, so startup fails when WEB_CONCURRENCY asks for more.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional
+from src.services.cache_service import CacheService
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional: only needed with QUOTE_REDIS_URL
+    aioredis = None
+
+
+class QuoteService:
+    """Issues HMAC-signed quote tokens and redeems each one at most once"""
+    
+    DEFAULT_TTL = 120  # seconds a quote stays valid
+    
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        ttl: Optional[int] = None,
+        cache: Optional[CacheService] = None,
+        redis_url: Optional[str] = None
+    ):
+        """
+        Initialize quote service
+        
+        Args:
+            secret: HMAC signing secret (falls back to QUOTE_SECRET; random per process if unset)
+            ttl: Quote lifetime in seconds (falls back to QUOTE_TTL)
+            cache: In-process store of redeemed quote ids (single worker only)
+            redis_url: Shared store of redeemed quote ids (falls back to QUOTE_REDIS_URL)
+        
+        Raises:
+            RuntimeError: If several workers are configured without a shared store
+        """
+        secret = secret or os.getenv("QUOTE_SECRET")
+        if not secret:
+            # Quotes then only verify in this process (not across workers or restarts)
+            print("⚠️ QUOTE_SECRET not set; using a random per-process secret")
+            secret = secrets.token_hex(32)
+        self._secret = secret.encode()
+        self.ttl = ttl or int(os.getenv("QUOTE_TTL", self.DEFAULT_TTL))
+        self.cache = cache or CacheService(max_entries=100000, default_ttl=self.ttl)
+        
+        redis_url = redis_url or os.getenv("QUOTE_REDIS_URL")
+        self.redis = None
+        if redis_url:
+            if aioredis is None:
+                raise RuntimeError("QUOTE_REDIS_URL is set but the redis package is not installed")
+            self.redis = aioredis.from_url(redis_url)
+        elif int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            raise RuntimeError("Quote replay protection needs QUOTE_REDIS_URL when running several workers")
+    
+    def issue(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sign a quote
+        
+        Args:
+            payload: JSON-serializable quote contents (intent, entities, gas, safety, ...)
+        
+        Returns:
+            Dictionary with the token, quote id and expiry (unix seconds)
+        """
+        quote = {**payload, "id": secrets.token_hex(16), "exp": int(time.time()) + self.ttl}
+        body = self._encode(json.dumps(quote, separators=(",", ":"), sort_keys=True).encode())
+        return {"token": f"{body}.{self._sign(body)}", "id": quote["id"], "expires_at": quote["exp"]}
+    
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Check a quote's signature and expiry without consuming it
+        
+        Args:
+            token: Quote token from issue()
+        
+        Returns:
+            The signed quote contents
+        
+        Raises:
+            ValueError: If the token is malformed, tampered with or expired
+        """
+        try:
+            body, signature = token.split(".")
+        except ValueError:
+            raise ValueError("Malformed quote token")
+        
+        if not hmac.compare_digest(signature, self._sign(body)):
+            raise ValueError("Invalid quote signature")
+        
+        quote = json.loads(self._decode(body))
+        if time.time() > quote["exp"]:
+            raise ValueError("Quote expired")
+        return quote
+    
+    async def redeem(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a quote and mark it used so it cannot be replayed
+        
+        Args:
+            token: Quote token from issue()
+        
+        Returns:
+            The signed quote contents
+        
+        Raises:
+            ValueError: If the token is invalid, expired or already redeemed
+        """
+        quote = self.verify(token)
+        key = f"quote:{quote['id']}"
+        # Remember the id until the quote would have expired anyway
+        ttl = max(1, quote["exp"] - int(time.time()) + 1)
+        
+        if self.redis is not None:
+            claimed = await self.redis.set(key, 1, nx=True, ex=ttl)
+        else:
+            # No await between the check and the set, so concurrent requests cannot both pass
+            claimed = self.cache.get(key) is None
+            if claimed:
+                self.cache.set(key, True, ttl=ttl)
+        
+        if not claimed:
+            raise ValueError("Quote already used")
+        return quote
+    
+    async def release(self, quote: Dict[str, Any]):
+        """
+        Make a redeemed quote usable again
+        
+        Only for payments that failed before anything was broadcast; a quote
+        whose transaction may be on chain must stay spent.
+        
+        Args:
+            quote: Quote contents returned by redeem()
+        """
+        key = f"quote:{quote['id']}"
+        if self.redis is not None:
+            await self.redis.delete(key)
+        else:
+            self.cache.delete(key)
+    
+    def _sign(self, body: str) -> str:
+        """HMAC-SHA256 signature of an encoded body"""
+        return self._encode(hmac.new(self._secret, body.encode(), hashlib.sha256).digest())
+    
+    @staticmethod
+    def _encode(data: bytes) -> str:
+        """URL-safe base64 without padding"""
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+    
+    @staticmethod
+    def _decode(data: str) -> bytes:
+        """Inverse of _encode"""
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
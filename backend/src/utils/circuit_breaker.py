@@ -0,0 +1,128 @@
+"""
+Circuit Breaker - Stops calling a degraded dependency and probes for recovery
+"""
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker that treats slow calls as failures"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        window_size: int = 50,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize circuit breaker
+        
+        Args:
+            window_size: Number of recent calls considered
+            min_calls: Calls needed in the window before the breaker can trip
+            failure_rate_threshold: Failure (or slow call) rate that trips the breaker
+            slow_call_seconds: Calls slower than this count as failures
+            open_seconds: How long to reject calls before probing again
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._outcomes: deque = deque(maxlen=window_size)  # True = failure or slow
+        self._probes_in_flight = 0
+        self.stats: Dict[str, int] = {"rejected": 0, "trips": 0}
+    
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the open period has passed"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+    
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed (and reserve a probe slot when half-open)
+        
+        Returns:
+            True if the call may proceed
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        
+        self.stats["rejected"] += 1
+        return False
+    
+    def record(self, success: bool, latency: float):
+        """
+        Record the outcome of an allowed call
+        
+        Args:
+            success: Whether the call succeeded
+            latency: Call duration in seconds
+        """
+        failed = not success or latency > self.slow_call_seconds
+        
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed:
+                self._trip()
+            else:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            return
+        
+        self._outcomes.append(failed)
+        if (
+            self._state == self.CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate_threshold
+        ):
+            self._trip()
+    
+    def release(self):
+        """Give back a probe slot for a call that was cancelled before completing"""
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+    
+    def _trip(self):
+        """Open the circuit"""
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.stats["trips"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get circuit breaker statistics
+        
+        Returns:
+            Dictionary with state, rolling failure rate, trips and rejected calls
+        """
+        return {
+            **self.stats,
+            "state": self.state,
+            "failure_rate": sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+        }
@@ -1,6 +1,7 @@
 """
 Formatter - Formats numbers, dates, addresses, etc.
 """
+import re
 from typing import Optional
 from datetime import datetime
 
@@ -93,4 +94,17 @@ class Formatter:
             return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
         else:
             return "just now"
-
+    
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """
+        Normalize a chat message for use as a cache/dedup key
+        
+        Args:
+            message: Raw user message
+            
+        Returns:
+            Lowercased message with collapsed whitespace and no trailing punctuation
+        """
+        normalized = " ".join(message.lower().split())
+        return re.sub(r"[\s.!?,;:]+$", "", normalized)
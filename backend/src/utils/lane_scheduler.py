@@ -0,0 +1,133 @@
+"""
+Lane Scheduler - Runs async jobs one at a time per key, with many keys in parallel
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class LaneFullError(Exception):
+    """Raised when a lane's queue is full"""
+
+
+class _Lane:
+    """Queue, worker and counters for one key"""
+    
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.worker: Optional[asyncio.Task] = None
+        self.running = False
+        self.stats: Dict[str, Any] = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0
+        }
+
+
+class LaneScheduler:
+    """Serializes jobs within a lane (e.g. one sending account) while lanes run concurrently"""
+    
+    def __init__(self, max_queue: int = 100, idle_seconds: float = 60.0):
+        """
+        Initialize lane scheduler
+        
+        Args:
+            max_queue: Jobs that may wait in one lane before submissions are rejected
+            idle_seconds: An empty lane's worker exits (and the lane is dropped) after this long
+        """
+        self.max_queue = max_queue
+        self.idle_seconds = idle_seconds
+        self._lanes: Dict[str, _Lane] = {}
+    
+    async def submit(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Queue a job in a lane and wait for its result
+        
+        A job that has started keeps running if its caller is cancelled.
+        
+        Args:
+            key: Lane key
+            fn: Zero-argument coroutine function to run
+        
+        Returns:
+            Result of fn
+        
+        Raises:
+            LaneFullError: If the lane already has max_queue jobs waiting
+        """
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(self.max_queue)
+        
+        future = asyncio.get_running_loop().create_future()
+        try:
+            lane.queue.put_nowait((fn, future, time.monotonic()))
+        except asyncio.QueueFull:
+            lane.stats["rejected"] += 1
+            raise LaneFullError(f"Too many pending transactions for {key}; try again shortly")
+        lane.stats["submitted"] += 1
+        
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.ensure_future(self._work(key, lane))
+        
+        return await future
+    
+    async def _work(self, key: str, lane: _Lane):
+        """Run a lane's jobs in order until it has been idle for idle_seconds"""
+        while True:
+            try:
+                job: Tuple[Callable[[], Awaitable[Any]], asyncio.Future, float] = await asyncio.wait_for(
+                    lane.queue.get(), timeout=self.idle_seconds
+                )
+            except asyncio.TimeoutError:
+                if lane.queue.empty():
+                    if self._lanes.get(key) is lane:
+                        del self._lanes[key]
+                    return
+                continue
+            
+            fn, future, enqueued_at = job
+            if future.cancelled():
+                continue  # caller gave up before the job started
+            
+            wait = time.monotonic() - enqueued_at
+            lane.stats["total_wait"] += wait
+            lane.stats["max_wait"] = max(lane.stats["max_wait"], wait)
+            lane.stats["last_wait"] = wait
+            
+            lane.running = True
+            try:
+                result = await fn()
+            except Exception as e:
+                lane.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                lane.stats["completed"] += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                lane.running = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-lane queue depth and wait time
+        
+        Returns:
+            Dictionary with active lane count and, per lane, depth, job counts and wait times (ms)
+        """
+        lanes = {}
+        for key, lane in self._lanes.items():
+            stats = lane.stats
+            started = stats["completed"] + stats["failed"]
+            lanes[key] = {
+                "depth": lane.queue.qsize(),
+                "running": lane.running,
+                "submitted": stats["submitted"],
+                "completed": stats["completed"],
+                "failed": stats["failed"],
+                "rejected": stats["rejected"],
+                "avg_wait_ms": stats["total_wait"] / started * 1000 if started else 0.0,
+                "max_wait_ms": stats["max_wait"] * 1000,
+                "last_wait_ms": stats["last_wait"] * 1000
+            }
+        return {"active_lanes": len(lanes), "max_queue": self.max_queue, "lanes": lanes}
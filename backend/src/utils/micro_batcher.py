@@ -0,0 +1,99 @@
+"""
+Micro Batcher - Groups concurrent async requests into small batches
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Collects items for a short window and processes them with one handler call"""
+    
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10
+    ):
+        """
+        Initialize micro batcher
+        
+        Args:
+            handler: Coroutine taking a list of items and returning one result per item, in order
+                (an Exception instance as an item's result fails only that caller)
+            max_batch_size: Flush as soon as this many items are waiting
+            max_wait_ms: Flush at most this long after the first item arrives
+        """
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Future] = set()
+        self.stats: Dict[str, int] = {"items": 0, "batches": 0}
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result
+        
+        Args:
+            item: Item to process
+        
+        Returns:
+            The handler's result for this item
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self.stats["items"] += 1
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Hand the pending items to the handler"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            self.stats["batches"] += 1
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the handler and resolve each caller's future"""
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get batching statistics
+        
+        Returns:
+            Dictionary with items, batches and average batch size
+        """
+        return {
+            **self.stats,
+            "avg_batch_size": self.stats["items"] / self.stats["batches"] if self.stats["batches"] else 0.0
+        }
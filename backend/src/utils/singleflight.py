@@ -0,0 +1,58 @@
+"""
+Single Flight - Coalesces concurrent identical async calls into one
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key"""
+    
+    def __init__(self):
+        """Initialize single flight group"""
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "shared": 0}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers of the same key
+        
+        The shared call keeps running if one caller is cancelled, so the
+        other callers still get its result. Callers receive the same result
+        object and must copy it before mutating.
+        
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine function to run
+        
+        Returns:
+            Result of fn
+        """
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.stats["shared"] += 1
+        
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: str, task: asyncio.Future):
+        """Drop a finished call from the in-flight table"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get coalescing statistics
+        
+        Returns:
+            Dictionary with total calls, calls that shared an in-flight call, and in-flight count
+        """
+        return {**self.stats, "in_flight": len(self._inflight)}
@@ -0,0 +1,184 @@
+"""
+Stage Metrics - Per-request stage timers and LLM token usage, aggregated into histograms
+
+The active StageTrace lives in a context variable, so code deep in the
+pipeline (model router, safety checks) can report into it without having it
+passed around; with no active trace every hook is a no-op.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+_current: ContextVar[Optional["StageTrace"]] = ContextVar("stage_trace", default=None)
+
+
+class StageTrace:
+    """Stage durations and LLM usage for one request"""
+    
+    __slots__ = ("stages", "prompt_tokens", "completion_tokens", "llm_calls", "_start", "_nested")
+    
+    def __init__(self):
+        """Start a trace"""
+        self.stages: Dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self._start = time.perf_counter()
+        # Time spent in nested stages, per open stage, so parents report exclusive time
+        self._nested: List[float] = []
+    
+    @contextmanager
+    def activate(self) -> Iterator["StageTrace"]:
+        """Make this the current trace for the enclosed code"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+    
+    def add_usage(self, response: Any):
+        """Add a completion's token usage"""
+        self.llm_calls += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the trace
+        
+        Returns:
+            Dictionary with per-stage and total milliseconds, token counts and LLM call count
+        """
+        return {
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_calls": self.llm_calls
+        }
+
+
+class _Stage:
+    """Times one stage of the current trace (exclusive of stages nested inside it)"""
+    
+    __slots__ = ("name", "trace", "start")
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = _current.get()
+    
+    def __enter__(self):
+        if self.trace is not None:
+            self.trace._nested.append(0.0)
+            self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        trace = self.trace
+        if trace is not None:
+            elapsed = time.perf_counter() - self.start
+            nested = trace._nested.pop()
+            trace.stages[self.name] = trace.stages.get(self.name, 0.0) + elapsed - nested
+            if trace._nested:
+                trace._nested[-1] += elapsed
+        return False
+
+
+def stage(name: str) -> _Stage:
+    """
+    Time a block as a named stage of the current trace
+    
+    Stages run sequentially within a request; time under the same name accumulates.
+    
+    Args:
+        name: Stage name (e.g. "classification", "extraction", "safety", "formatting")
+    
+    Returns:
+        Context manager
+    """
+    return _Stage(name)
+
+
+def record_usage(response: Any):
+    """Add a completion's token usage to the current trace, if any"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_usage(response)
+
+
+class StageHistograms:
+    """Fixed-bucket latency histograms per stage, plus token totals"""
+    
+    # Upper bounds in milliseconds; the last bucket is unbounded
+    BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+    
+    def __init__(self):
+        """Initialize histograms"""
+        self._histograms: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+    
+    def observe(self, summary: Dict[str, Any]):
+        """
+        Add one request's trace summary
+        
+        Args:
+            summary: StageTrace.to_dict() output
+        """
+        self.requests += 1
+        self.prompt_tokens += summary["prompt_tokens"]
+        self.completion_tokens += summary["completion_tokens"]
+        self.llm_calls += summary["llm_calls"]
+        
+        for name, ms in [*summary["stages_ms"].items(), ("total", summary["total_ms"])]:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    "count": 0, "sum_ms": 0.0, "buckets": [0] * (len(self.BUCKETS_MS) + 1)
+                }
+            histogram["count"] += 1
+            histogram["sum_ms"] += ms
+            histogram["buckets"][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+    
+    def _quantile(self, buckets: List[int], count: int, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when in the unbounded bucket)"""
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return self.BUCKETS_MS[index] if index < len(self.BUCKETS_MS) else None
+        return None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get histogram statistics
+        
+        Returns:
+            Dictionary with per-stage counts, means, bucketed p50/p95/p99 and token averages
+        """
+        stages = {}
+        for name, histogram in self._histograms.items():
+            count = histogram["count"]
+            stages[name] = {
+                "count": count,
+                "avg_ms": histogram["sum_ms"] / count,
+                "p50_ms": self._quantile(histogram["buckets"], count, 0.50),
+                "p95_ms": self._quantile(histogram["buckets"], count, 0.95),
+                "p99_ms": self._quantile(histogram["buckets"], count, 0.99),
+                "buckets": dict(zip([*map(str, self.BUCKETS_MS), "inf"], histogram["buckets"]))
+            }
+        return {
+            "requests": self.requests,
+            "stages": stages,
+            "avg_prompt_tokens": self.prompt_tokens / self.requests if self.requests else 0.0,
+            "avg_completion_tokens": self.completion_tokens / self.requests if self.requests else 0.0,
+            "avg_llm_calls": self.llm_calls / self.requests if self.requests else 0.0
+        }
@@ -0,0 +1,9 @@
+"""
+Shared test setup
+
+The AI modules build an OpenAI client on import; tests never reach the API,
+so any key will do.
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
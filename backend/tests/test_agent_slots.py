@@ -0,0 +1,71 @@
+"""
+Tests for follow-up messages that fill or cancel a pending payment
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from src.ai.agent import AIAgent
+
+
+@pytest.fixture
+def agent():
+    agent = AIAgent()
+    
+    # Fake LLM: "send $50" is a payment missing its recipient, anything else is unknown
+    async def create(**kwargs):
+        if kwargs["messages"][-1]["content"] == "send $50":
+            content = json.dumps({"intent": "simple_payment", "entities": {"amount": 50}})
+        else:
+            content = json.dumps({"intent": "unknown", "entities": {}})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+    
+    agent.intent_classifier.llm.client.chat.completions.create = create
+    return agent
+
+
+async def follow_up(agent, message, session_id="s1"):
+    await agent.process_message("send $50", session_id=session_id)
+    return await agent.process_message(message, session_id=session_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("message", ["to alice", "alice@example.com", "0x" + "3" * 40])
+async def test_follow_up_fills_recipient(agent, message):
+    result = await follow_up(agent, message)
+    assert result["intent"] == "simple_payment"
+    assert result["entities"]["amount"] == 50
+    assert result["entities"]["recipient"] == message.removeprefix("to ")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("message", ["cancel", "no", "nevermind", "stop"])
+async def test_follow_up_cancels(agent, message):
+    result = await follow_up(agent, message)
+    assert result["intent"] == "unknown"
+    assert result["entities"] == {"cancelled": True}
+    
+    # The pending payment is gone: a later recipient does not complete it
+    result = await agent.process_message("to alice", session_id="s1")
+    assert result["intent"] != "simple_payment"
+
+
+@pytest.mark.asyncio
+async def test_bare_name_is_not_taken_as_recipient(agent):
+    result = await follow_up(agent, "bob")
+    assert result["intent"] != "simple_payment"
+    assert "recipient" not in result["entities"]
+
+
+@pytest.mark.asyncio
+async def test_another_address_cannot_complete_the_payment(agent):
+    await agent.process_message("send $50", user_address="0xalice", session_id="s1")
+    result = await agent.process_message("to mallory", user_address="0xmallory", session_id="s1")
+    assert result["intent"] != "simple_payment"
+    assert "recipient" not in result["entities"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_with_more_words_is_a_new_request(agent):
+    result = await follow_up(agent, "stop my netflix subscription")
+    assert result["entities"] != {"cancelled": True}
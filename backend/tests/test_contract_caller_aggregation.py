@@ -0,0 +1,130 @@
+"""
+Tests for coalescing a sender's payments into batchPayments transactions
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode
+from web3 import Web3
+from src.blockchain.contract_caller import ContractCaller
+
+ROUTER = Web3.to_checksum_address("0x" + "11" * 20)
+ALICE = Web3.to_checksum_address("0x" + "22" * 20)
+BOB = Web3.to_checksum_address("0x" + "33" * 20)
+
+
+def payment_log(recipient: str, amount_usdc: int) -> dict:
+    """A PaymentExecuted log as it appears in a receipt"""
+    return {
+        "address": ROUTER,
+        "topics": [ContractCaller.PAYMENT_EXECUTED_TOPIC, bytes(32), bytes(12) + bytes.fromhex(recipient[2:])],
+        "data": encode(["uint256", "string", "uint256"], [amount_usdc, "", 1]),
+    }
+
+
+class FakeArc:
+    """Arc client that records sends and returns a canned receipt"""
+    
+    def __init__(self, receipt=None, error=None):
+        self.sent = []
+        self.receipt = receipt
+        self.error = error
+        self.timeout = 1
+        self.account = SimpleNamespace(address="0x" + "44" * 20)
+        
+        async def wait_for_transaction_receipt(tx_hash, timeout):
+            if self.receipt is None:
+                raise asyncio.TimeoutError()
+            return self.receipt
+        
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(wait_for_transaction_receipt=wait_for_transaction_receipt))
+    
+    async def call(self, request, timeout=None):
+        return await request
+    
+    async def send_transaction(self, **kwargs):
+        self.sent.append(kwargs["function_name"])
+        if self.error:
+            raise self.error
+        return "0xbatch"
+
+
+def caller(arc: FakeArc, aggregation: bool = True) -> ContractCaller:
+    return ContractCaller(arc, {"PaymentRouter": {"address": ROUTER, "abi": []}}, aggregation=aggregation)
+
+
+async def pay_alice_and_bob(contract_caller: ContractCaller):
+    return await asyncio.gather(
+        contract_caller.send_payment(ALICE, 1), contract_caller.send_payment(BOB, 2), return_exceptions=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_payments_share_one_batch():
+    arc = FakeArc(receipt={"status": 1, "logs": [payment_log(ALICE, 10**6), payment_log(BOB, 2 * 10**6)]})
+    contract_caller = caller(arc)
+    assert await pay_alice_and_bob(contract_caller) == ["0xbatch", "0xbatch"]
+    assert arc.sent == ["batchPayments"]
+    assert contract_caller.aggregation_counts["payments"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_resent():
+    arc = FakeArc(error=asyncio.TimeoutError())
+    contract_caller = caller(arc)
+    results = await pay_alice_and_bob(contract_caller)
+    assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+    assert arc.sent == ["batchPayments"]
+    assert contract_caller.aggregation_counts["failed_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reverted_batch_fails_every_payment():
+    arc = FakeArc(receipt={"status": 0, "logs": []})
+    contract_caller = caller(arc)
+    results = await pay_alice_and_bob(contract_caller)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert contract_caller.aggregation_counts["reverted_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_payment_without_event_fails_alone():
+    arc = FakeArc(receipt={"status": 1, "logs": [payment_log(ALICE, 10**6)]})
+    results = await pay_alice_and_bob(caller(arc))
+    assert results[0] == "0xbatch"
+    assert isinstance(results[1], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_batch_returns_hash():
+    arc = FakeArc(receipt=None)
+    contract_caller = caller(arc)
+    assert await pay_alice_and_bob(contract_caller) == ["0xbatch", "0xbatch"]
+    assert contract_caller.aggregation_counts["unconfirmed_batches"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("recipient, amount", [
+    (ALICE, 10001),             # over SafetyChecker.MAX_SINGLE_TRANSACTION
+    (ALICE, 0),
+    ("0x" + "0" * 40, 1),
+    ("bob", 1),
+])
+@pytest.mark.parametrize("aggregation", [True, False])
+async def test_invalid_payments_are_rejected_before_sending(recipient, amount, aggregation):
+    arc = FakeArc()
+    with pytest.raises(ValueError):
+        await caller(arc, aggregation).send_payment(recipient, amount)
+    assert arc.sent == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("aggregation", [True, False])
+async def test_single_payment_returns_once_mined(aggregation):
+    arc = FakeArc(receipt={"status": 1, "logs": []})
+    assert await caller(arc, aggregation).send_payment(ALICE, 1) == "0xbatch"
+    
+    arc.receipt = {"status": 0, "logs": []}
+    with pytest.raises(RuntimeError):
+        await caller(arc, aggregation).send_payment(ALICE, 1)
@@ -0,0 +1,54 @@
+"""
+Tests for fee suggestions and quoted fees
+"""
+from types import SimpleNamespace
+
+import pytest
+from src.blockchain.fee_oracle import FeeOracle
+from src.blockchain.gas_estimator import GasEstimator
+
+GWEI = 10**9
+
+
+class FakeArc:
+    """Arc client with a fixed fee history (no history means a legacy chain)"""
+    
+    def __init__(self, base_fee: int = 0, tip: int = 0, gas_price: int = 3 * GWEI):
+        async def fee_history(blocks, newest, percentiles):
+            if not base_fee:
+                return {}
+            return {"baseFeePerGas": [base_fee] * (blocks + 1), "reward": [[tip]] * blocks, "oldestBlock": 100}
+        
+        class Eth:
+            @property
+            async def gas_price(self):
+                return gas_price
+        
+        eth = Eth()
+        eth.fee_history = fee_history
+        self.w3 = SimpleNamespace(eth=eth)
+        self.fees = FeeOracle(self)
+    
+    async def call(self, request, timeout=None):
+        return await request
+
+
+@pytest.mark.asyncio
+async def test_legacy_gas_price_is_base_fee_plus_tip():
+    arc = FakeArc(base_fee=10 * GWEI, tip=GWEI)
+    fees = await arc.fees.get_fees()
+    assert fees["gas_price"] == 11 * GWEI
+    assert fees["max_fee"] == 21 * GWEI
+    assert await GasEstimator(arc).get_gas_price() == 11 * GWEI
+
+
+@pytest.mark.asyncio
+async def test_quotes_carry_max_fees_on_eip1559_chains():
+    arc = FakeArc(base_fee=10 * GWEI, tip=GWEI)
+    assert await GasEstimator(arc).quote_fees() == {"max_fee": 21 * GWEI, "max_priority_fee": GWEI}
+
+
+@pytest.mark.asyncio
+async def test_quotes_carry_gas_price_on_legacy_chains():
+    arc = FakeArc(gas_price=3 * GWEI)
+    assert await GasEstimator(arc).quote_fees() == {"gas_price": 3 * GWEI}
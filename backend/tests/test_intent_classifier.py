@@ -0,0 +1,92 @@
+"""
+Tests for the intent classifier's local and degraded paths
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from src.ai.intent_classifier import Intent, IntentClassifier
+from src.ai.prompts import BATCH_CLASSIFY_PROMPT
+from src.utils.circuit_breaker import CircuitBreaker
+
+
+class FakeEmbeddingClassifier:
+    """Embedding backend that always returns the same match"""
+    
+    def __init__(self, intent: str):
+        self.intent = intent
+    
+    async def classify(self, user_message):
+        return self.intent, 0.9
+
+
+@pytest.mark.asyncio
+async def test_embedding_match_on_money_moving_intent_is_left_to_the_llm():
+    classifier = IntentClassifier(embedding_classifier=FakeEmbeddingClassifier("simple_payment"))
+    assert await classifier.classify_embedding("don't pay bob 20 dollars") is None
+
+
+@pytest.mark.asyncio
+async def test_embedding_match_on_read_only_intent_is_used():
+    classifier = IntentClassifier(embedding_classifier=FakeEmbeddingClassifier("balance_query"))
+    assert await classifier.classify_embedding("what's left in my wallet") == Intent.BALANCE_QUERY
+
+
+def fake_completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.mark.asyncio
+async def test_batch_takes_each_answer_only_from_its_own_id():
+    classifier = IntentClassifier(batch_classification=False)
+    requests = []
+    
+    # Message 1's answer is duplicated and message 2's is missing: both are classified again alone
+    async def create(**kwargs):
+        requests.append(kwargs)
+        if kwargs["messages"][0]["content"] == BATCH_CLASSIFY_PROMPT:
+            return fake_completion(json.dumps({"results": [
+                {"id": 0, "intent": "balance_query"},
+                {"id": 1, "intent": "simple_payment"},
+                {"id": 1, "intent": "help"},
+                {"id": 7, "intent": "simple_payment"},
+            ]}))
+        return fake_completion("history")
+    
+    classifier.llm.client.chat.completions.create = create
+    intents = await classifier._classify_batch_llm(["balance?", "pay everyone", "my payments"])
+    
+    assert intents == [Intent.BALANCE_QUERY, Intent.TRANSACTION_HISTORY, Intent.TRANSACTION_HISTORY]
+    assert json.loads(requests[0]["messages"][1]["content"]) == [
+        {"id": 0, "message": "balance?"}, {"id": 1, "message": "pay everyone"}, {"id": 2, "message": "my payments"}
+    ]
+    assert len(requests) == 3
+
+
+def test_degraded_mode_never_moves_money():
+    classifier = IntentClassifier()
+    assert classifier.classify_degraded("send some money to alice and bob") == Intent.UNKNOWN
+    assert classifier.classify_degraded("send $50 to alice") == Intent.UNKNOWN
+
+
+def half_open(classifier: IntentClassifier):
+    """Put the LLM breaker in half-open state with its one probe call already in flight"""
+    breaker = classifier.llm.breaker
+    breaker._state = CircuitBreaker.HALF_OPEN
+    breaker._probes_in_flight = breaker.half_open_max_calls
+
+
+@pytest.mark.asyncio
+async def test_half_open_circuit_degrades_instead_of_unknown():
+    classifier = IntentClassifier(batch_classification=False)
+    half_open(classifier)
+    try:
+        assert classifier.llm.available
+        assert await classifier.classify("what's my balance", use_local=False) == Intent.BALANCE_QUERY
+        assert await classifier.classify_and_extract("show my transaction history") == (
+            Intent.TRANSACTION_HISTORY, {}
+        )
+        assert classifier.path_counts["degraded"] == 2
+    finally:
+        classifier.llm.breaker._state = CircuitBreaker.CLOSED
+        classifier.llm.breaker._probes_in_flight = 0
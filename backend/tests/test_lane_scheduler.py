@@ -0,0 +1,79 @@
+"""
+Tests for per-sender submission lanes
+"""
+import asyncio
+
+import pytest
+from src.utils.lane_scheduler import LaneFullError, LaneScheduler
+
+
+@pytest.mark.asyncio
+async def test_jobs_in_a_lane_run_one_at_a_time_in_order():
+    lanes = LaneScheduler(idle_seconds=0.05)
+    order = []
+    running = 0
+    
+    async def job(i):
+        nonlocal running
+        running += 1
+        assert running == 1
+        await asyncio.sleep(0.001)
+        order.append(i)
+        running -= 1
+        return i
+    
+    results = await asyncio.gather(*(lanes.submit("A", lambda i=i: job(i)) for i in range(5)))
+    assert results == order == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_lanes_run_in_parallel():
+    lanes = LaneScheduler(idle_seconds=0.05)
+    both_started = asyncio.Event()
+    started = []
+    
+    async def job(key):
+        started.append(key)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return key
+    
+    assert await asyncio.gather(lanes.submit("A", lambda: job("A")), lanes.submit("B", lambda: job("B"))) == ["A", "B"]
+
+
+@pytest.mark.asyncio
+async def test_full_lane_rejects():
+    lanes = LaneScheduler(max_queue=1, idle_seconds=0.05)
+    release = asyncio.Event()
+    
+    async def job():
+        await release.wait()
+    
+    first = asyncio.ensure_future(lanes.submit("A", job))
+    while not lanes.get_stats()["lanes"].get("A", {}).get("running"):
+        await asyncio.sleep(0)  # wait for the first job to start, leaving the queue empty
+    second = asyncio.ensure_future(lanes.submit("A", job))
+    await asyncio.sleep(0)  # the second job fills the queue
+    
+    with pytest.raises(LaneFullError):
+        await lanes.submit("A", job)
+    assert lanes.get_stats()["lanes"]["A"]["rejected"] == 1
+    
+    release.set()
+    await asyncio.gather(first, second)
+
+
+@pytest.mark.asyncio
+async def test_failed_job_fails_only_its_caller():
+    lanes = LaneScheduler(idle_seconds=0.05)
+    
+    async def fail():
+        raise ValueError("boom")
+    
+    async def succeed():
+        return "ok"
+    
+    results = await asyncio.gather(lanes.submit("A", fail), lanes.submit("A", succeed), return_exceptions=True)
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "ok"
@@ -0,0 +1,70 @@
+"""
+Tests for the local entity parser
+"""
+import pytest
+from src.ai.local_entity_parser import LocalEntityParser
+
+
+@pytest.fixture
+def parser():
+    return LocalEntityParser()
+
+
+def test_parses_amount_recipient_and_description(parser):
+    assert parser.parse("send $1,000 to alice for rent and food") == {
+        "amount": 1000.0, "recipient": "alice", "description": "rent and food"
+    }
+
+
+@pytest.mark.parametrize("message", ["send 5 eth to bob", "send €20 to bob", "pay 3 btc to alice"])
+def test_other_currencies_have_no_amount(parser, message):
+    assert "amount" not in parser.parse(message)
+
+
+@pytest.mark.parametrize("message", ["send $50 to alice and bob", "send $50 to alice, bob"])
+def test_several_recipients_leave_recipient_unset(parser, message):
+    assert "recipient" not in parser.parse(message)
+
+
+def test_parses_payment_pairs(parser):
+    assert parser.parse_payments("Send $5 to A, $10 to B and $20 to C") == [
+        {"amount": 5.0, "recipient": "A"},
+        {"amount": 10.0, "recipient": "B"},
+        {"amount": 20.0, "recipient": "C"},
+    ]
+
+
+@pytest.mark.parametrize("message", [
+    "send $50 to alice",
+    "send $5 to alice instead of $10 to bob",
+    "send $5 to alice, not $10 to bob",
+    "send $5 to alice. Actually, change that: $10 to bob",
+    "pay $50 to alice every month and $10 to bob",
+    "send $5 to alice and $10 to bob for lunch",
+    "send $5 to me and $10 to bob",
+])
+def test_payment_pairs_must_be_a_strict_list(parser, message):
+    assert parser.parse_payments(message) is None
+
+
+def test_payment_pairs_are_capped(parser):
+    pairs = ", ".join(f"$1 to u{i}" for i in range(LocalEntityParser.MAX_BATCH_PAYMENTS + 1))
+    assert parser.parse_payments(f"send {pairs}") is None
+    pairs = ", ".join(f"$1 to u{i}" for i in range(LocalEntityParser.MAX_BATCH_PAYMENTS))
+    assert len(parser.parse_payments(f"send {pairs}")) == LocalEntityParser.MAX_BATCH_PAYMENTS
+
+
+@pytest.mark.parametrize("message", ["cancel", "no", "nevermind", "stop"])
+def test_cancellations(parser, message):
+    assert parser.is_cancellation(message)
+
+
+@pytest.mark.parametrize("message", ["stop my netflix subscription", "cancel my spotify", "no, send $20 instead"])
+def test_requests_starting_with_a_cancel_word_are_not_cancellations(parser, message):
+    assert not parser.is_cancellation(message)
+
+
+def test_bare_name_is_not_a_recipient_slot(parser):
+    assert "recipient" not in parser.parse_slots("bob", {"recipient"})
+    assert parser.parse_slots("to alice", {"recipient"}) == {"recipient": "alice"}
+    assert parser.parse_slots("alice@example.com", {"recipient"}) == {"recipient": "alice@example.com"}
@@ -0,0 +1,35 @@
+"""
+Tests for model routing
+"""
+from fastapi.testclient import TestClient
+
+from src.ai.model_router import ModelRouter
+
+LONG_MESSAGE = "send " + "x" * ModelRouter.LONG_MESSAGE_LENGTH
+
+
+def test_models_are_read_when_the_router_is_built(monkeypatch):
+    monkeypatch.setenv("AI_MODEL", "small-model")
+    monkeypatch.setenv("AI_LARGE_MODEL", "large-model")
+    router = ModelRouter()
+    assert router.route("fused", "check my balance")["model"] == "small-model"
+    assert router.route("fused", LONG_MESSAGE)["model"] == "large-model"
+    assert router.fallback["model"] == "small-model"
+
+
+def test_large_model_is_opt_in(monkeypatch):
+    monkeypatch.delenv("AI_MODEL", raising=False)
+    monkeypatch.delenv("AI_LARGE_MODEL", raising=False)
+    router = ModelRouter()
+    assert router.route("fused", LONG_MESSAGE)["model"] == ModelRouter.DEFAULT_MODEL
+    assert router.route("extract", LONG_MESSAGE)["model"] == ModelRouter.DEFAULT_MODEL
+
+
+def test_reload_requires_admin_token(monkeypatch):
+    from main import app
+    
+    monkeypatch.setenv("AI_ADMIN_TOKEN", "secret")
+    client = TestClient(app)
+    assert client.post("/api/ai/routing/reload").status_code == 401
+    assert client.post("/api/ai/routing/reload", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.post("/api/ai/routing/reload", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,83 @@
+"""
+Tests for local nonce allocation and resyncs
+"""
+from types import SimpleNamespace
+
+import pytest
+from src.blockchain.nonce_manager import NonceManager
+
+
+class FakeArc:
+    """Arc client whose pending transaction count is set by the test"""
+    
+    def __init__(self, chain_nonce: int):
+        self.chain_nonce = chain_nonce
+        
+        async def get_transaction_count(address, block):
+            return self.chain_nonce
+        
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_count=get_transaction_count))
+    
+    async def call(self, request, timeout=None):
+        return await request
+
+
+@pytest.mark.asyncio
+async def test_allocates_sequentially_after_one_sync():
+    nonces = NonceManager(FakeArc(5))
+    assert [await nonces.allocate("A") for _ in range(3)] == [5, 6, 7]
+    assert nonces.get_stats()["syncs"] == 1
+    assert nonces.get_stats()["in_flight"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failure_does_not_resync_while_sends_are_in_flight():
+    arc = FakeArc(5)
+    nonces = NonceManager(arc)
+    for _ in range(3):
+        await nonces.allocate("A")
+    
+    # 5 failed while 6 and 7 are in flight: handing out 5 or 6 again would collide
+    nonces.release("A", RuntimeError("timeout"))
+    arc.chain_nonce = 5
+    assert await nonces.allocate("A") == 8
+    assert nonces.get_stats()["resyncs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_resyncs_once_idle():
+    arc = FakeArc(5)
+    nonces = NonceManager(arc)
+    await nonces.allocate("A")
+    await nonces.allocate("A")
+    nonces.release("A", RuntimeError("timeout"))
+    nonces.release("A")
+    
+    # The failed nonce was never used, so the chain's count is reused
+    arc.chain_nonce = 6
+    assert await nonces.allocate("A") == 6
+    assert nonces.get_stats()["resyncs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_nonce_too_low_catches_up_with_sends_in_flight():
+    arc = FakeArc(5)
+    nonces = NonceManager(arc)
+    await nonces.allocate("A")
+    await nonces.allocate("A")
+    nonces.release("A", ValueError("nonce too low"))
+    
+    arc.chain_nonce = 20
+    assert await nonces.allocate("A") == 20
+    
+    # Never moves backwards past nonces still in flight
+    nonces.release("A", ValueError("nonce too low"))
+    arc.chain_nonce = 3
+    assert await nonces.allocate("A") == 21
+
+
+@pytest.mark.asyncio
+async def test_accounts_are_independent():
+    nonces = NonceManager(FakeArc(5))
+    assert await nonces.allocate("A") == 5
+    assert await nonces.allocate("B") == 5
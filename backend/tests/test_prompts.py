@@ -0,0 +1,40 @@
+"""
+Tests for the prompt registry
+"""
+import pytest
+from src.ai.intent_classifier import Intent
+from src.ai.prompts import (
+    BATCH_CLASSIFY_PROMPT, BATCH_CLASSIFY_SCHEMA, CLASSIFY_AND_EXTRACT_PROMPT, CLASSIFY_PROMPT,
+    EXTRACT_PROMPT_TOKEN_BUDGET, EXTRACT_PROMPTS, INTENT_DESCRIPTIONS, INTENT_FIELDS
+)
+from src.ai.token_counter import check_prompt_sizes, count_tokens
+
+
+@pytest.mark.parametrize("intent", list(EXTRACT_PROMPTS))
+def test_extract_prompt_within_token_budget(intent):
+    assert count_tokens(EXTRACT_PROMPTS[intent]) <= EXTRACT_PROMPT_TOKEN_BUDGET
+
+
+def test_check_prompt_sizes_reports_nothing():
+    assert check_prompt_sizes(EXTRACT_PROMPTS, EXTRACT_PROMPT_TOKEN_BUDGET) == []
+
+
+def test_extract_prompts_only_list_their_intents_fields():
+    assert "payments" not in EXTRACT_PROMPTS["simple_payment"]
+    assert "num_people" in EXTRACT_PROMPTS["split_payment"]
+    assert set(EXTRACT_PROMPTS) == set(INTENT_FIELDS)
+
+
+def test_intent_registry_matches_intent_enum():
+    assert list(INTENT_DESCRIPTIONS) == [intent.value for intent in Intent]
+
+
+@pytest.mark.parametrize("prompt", [CLASSIFY_PROMPT, CLASSIFY_AND_EXTRACT_PROMPT, BATCH_CLASSIFY_PROMPT])
+def test_classifier_prompts_list_every_intent(prompt):
+    for intent, description in INTENT_DESCRIPTIONS.items():
+        assert f"- {intent}: {description}" in prompt
+
+
+def test_batch_schema_allows_exactly_the_registry_intents():
+    item = BATCH_CLASSIFY_SCHEMA["schema"]["properties"]["results"]["items"]
+    assert item["properties"]["intent"]["enum"] == list(INTENT_DESCRIPTIONS)
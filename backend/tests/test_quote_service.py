@@ -0,0 +1,106 @@
+"""
+Tests for quote signing and single-use redemption
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from src.ai.safety import SafetyChecker
+from src.api.routes import ConfirmRequest, confirm_payment, quote_payment
+from src.services.quote_service import QuoteService
+
+
+@pytest.fixture
+def quotes(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("QUOTE_REDIS_URL", raising=False)
+    return QuoteService(secret="test-secret")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_redeems_succeed_once(quotes):
+    token = quotes.issue({"amount": 50})["token"]
+    results = await asyncio.gather(quotes.redeem(token), quotes.redeem(token), return_exceptions=True)
+    assert sum(isinstance(r, ValueError) for r in results) == 1
+    assert any(isinstance(r, dict) and r["amount"] == 50 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_released_quote_can_be_redeemed_again(quotes):
+    token = quotes.issue({"amount": 50})["token"]
+    quote = await quotes.redeem(token)
+    with pytest.raises(ValueError):
+        await quotes.redeem(token)
+    await quotes.release(quote)
+    assert (await quotes.redeem(token))["amount"] == 50
+
+
+@pytest.mark.asyncio
+async def test_tampered_token_is_rejected(quotes):
+    token = quotes.issue({"amount": 50})["token"]
+    other = QuoteService(secret="other-secret")
+    with pytest.raises(ValueError):
+        await other.redeem(token)
+
+
+def test_several_workers_require_redis(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.delenv("QUOTE_REDIS_URL", raising=False)
+    with pytest.raises(RuntimeError):
+        QuoteService(secret="test-secret")
+
+
+class FakeCaller:
+    async def estimate_payment(self, recipient, amount, memo, from_address):
+        return {"gas": 60000, "gas_price": 10}
+
+
+class FakeAgent:
+    def __init__(self):
+        self.safety_checker = SafetyChecker()
+
+
+def payment_result(amount):
+    return {
+        "intent": "simple_payment",
+        "status": "success",
+        "entities": {"amount": amount, "recipient": "0xabc", "description": ""}
+    }
+
+
+@pytest.mark.asyncio
+async def test_quote_carries_the_safety_verdict(quotes):
+    result = payment_result(2000)
+    quote = await quote_payment(result, FakeCaller(), quotes, SafetyChecker(), "0xuser")
+    assert quotes.verify(quote["token"])["safety"] == {
+        "within_limits": True, "reason": "OK", "requires_confirmation": True
+    }
+
+
+@pytest.mark.asyncio
+async def test_payment_over_the_limits_is_not_quoted(quotes):
+    checker = SafetyChecker()
+    checker.record_transaction("0xuser", SafetyChecker.MAX_DAILY_AMOUNT)
+    with pytest.raises(ValueError):
+        await quote_payment(payment_result(2000), FakeCaller(), quotes, checker, "0xuser")
+
+
+@pytest.mark.asyncio
+async def test_confirm_rechecks_limits_and_keeps_the_quote(quotes):
+    agent = FakeAgent()
+    quote = await quote_payment(payment_result(2000), FakeCaller(), quotes, agent.safety_checker, "0xuser")
+    # The daily total grew after the quote was issued
+    agent.safety_checker.record_transaction("0xuser", SafetyChecker.MAX_DAILY_AMOUNT)
+    
+    with pytest.raises(HTTPException) as exc:
+        await confirm_payment(ConfirmRequest(quote_token=quote["token"]), agent, FakeCaller(), quotes)
+    assert exc.value.status_code == 400
+    assert (await quotes.redeem(quote["token"]))["id"] == quote["id"]
+
+
+@pytest.mark.asyncio
+async def test_small_payment_is_quoted_when_always_is_set(quotes):
+    result = payment_result(20)
+    assert await quote_payment(result, FakeCaller(), quotes, SafetyChecker(), "0xuser") is None
+    assert await quote_payment(result, FakeCaller(), quotes, SafetyChecker(), "0xuser", always=True)
+    assert result["status"] == "confirmation_required"
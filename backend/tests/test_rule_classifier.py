@@ -0,0 +1,44 @@
+"""
+Tests for the rule-based classifier
+"""
+import pytest
+from src.ai.rule_classifier import RuleBasedClassifier
+
+
+@pytest.fixture
+def classifier():
+    return RuleBasedClassifier()
+
+
+@pytest.mark.parametrize("message", [
+    "Send $50 to Alice",
+    "pay $20 to bob for lunch",
+    "send 20 usdc to bob@example.com",
+    "send $50 to 0x1234567890abcdef1234567890abcdef12345678",
+    "transfer $5 to @carol",
+])
+def test_plain_payments_match(classifier, message):
+    assert classifier.classify(message) == "simple_payment"
+
+
+@pytest.mark.parametrize("message", [
+    "send $50 to alice and bob",
+    "pay $50 to alice if she finishes the job",
+    "send $50 to alice, not bob",
+    "send $50 to alice instead",
+    "Should I pay $200 to bob?",
+    "don't send $50 to alice",
+    "send $5 to alice and $10 to bob",
+])
+def test_qualified_payments_are_left_to_the_llm(classifier, message):
+    assert classifier.classify(message) is None
+
+
+def test_thousands_separator_is_not_a_clause(classifier):
+    assert classifier.classify("send $1,000 to alice") == "simple_payment"
+
+
+@pytest.mark.parametrize("message", ["don't send money to alice", "never pay bob", "I didn't transfer anything"])
+def test_lenient_ignores_negated_messages(classifier, message):
+    assert classifier.classify_lenient(message) == "unknown"
+